@@ -62,13 +62,14 @@ class CompilationEngine:
     into an xml code saved in the out_file
     """
 
-    def __init__(self, in_file, out_file):
+    def __init__(self, in_file, out_file, cache=None):
         """
         A compilation engine constructor
         :param in_file: the file we are currently compiling
         :param out_file: the file where we save the output
+        :param cache: a TokenCache for the tokens of the file or None
         """
-        self.tokenizer = JackTokenizer(in_file)
+        self.tokenizer = JackTokenizer(in_file, whole_file=True, cache=cache)
         self.out_file = open(out_file, 'w')
         self._indent_count = 0
 
@@ -1,11 +1,12 @@
 #!/bin/bash
+import argparse
 import os
 from CompilationEngine import *
+from TokenCache import TokenCache
 
 INVALID_INPUT_ERROR = "Invalid input file"
 
-NUM_OF_ARG = 2
-ARG_ERROR = "Wrong Number of args"
+COMPILER_VERSION = "1.2"
 
 
 class JackAnalyzer:
@@ -13,13 +14,16 @@ class JackAnalyzer:
     The Jack analyzer class runs the show
     """
 
-    def __init__(self, path):
+    def __init__(self, path, use_cache=True):
         """
         constructor for the Jack Analyzer
         :param path: the path of the file / directory we wish to compile
+        :param use_cache: if true the tokens of every file are cached next to
+        the output files, so unchanged files are not tokenized again
         """
         self._in_path = path
         self._out_path = path
+        self._use_cache = use_cache
         self._inputs = self._get_paths()
 
     def create_out(self):
@@ -29,9 +33,15 @@ class JackAnalyzer:
         and the engine compiles the infile and saves the output in
         the output file
         """
+        cache = None
+        if self._use_cache:
+            cache = TokenCache(self._out_path, COMPILER_VERSION)
+            if os.path.isdir(self._in_path):  # all the files of the cache
+                cache.keep_only(self._inputs)
         for file in self._inputs:
             out_name = str(os.path.basename(file).split('.')[0]) + ".xml"
-            comp = CompilationEngine(file, self._out_path + "/" + out_name)
+            comp = CompilationEngine(file, self._out_path + "/" + out_name,
+                                     cache)
             comp.compile_class()
 
     def _get_paths(self):
@@ -56,9 +66,11 @@ class JackAnalyzer:
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != NUM_OF_ARG:
-        print(ARG_ERROR)
-        sys.exit()
-    current_input = sys.argv[1]
-    analyzer = JackAnalyzer(current_input)
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("path", help="a jack file or a directory of jack "
+                                         "files")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="do not use the token cache")
+    args = arg_parser.parse_args()
+    analyzer = JackAnalyzer(args.path, not args.no_cache)
     analyzer.create_out()
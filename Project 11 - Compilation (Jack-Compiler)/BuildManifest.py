@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".jackmanifest.json"
+
+READ_CHUNK = 1 << 16
+
+
+class BuildManifest:
+    """
+    remembers for every compiled class the hash of its source and the hash
+    of the vm file we made from it, so an incremental build only compiles
+    the classes whose source changed or whose output is missing or was
+    changed since. the manifest is kept next to the output files and is
+    dropped whole when the compiler version changes
+    """
+
+    def __init__(self, directory, version):
+        """
+        loads the manifest of the given output directory (if there is one)
+        :param directory: the directory of the output files
+        :param version: the version of the compiler (and of its options)
+        """
+        self._path = os.path.join(directory, MANIFEST_NAME)
+        self._version = version
+        self._files = dict()
+        try:
+            with open(self._path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return
+        if isinstance(manifest, dict) and \
+                manifest.get("version") == version and \
+                isinstance(manifest.get("files"), dict):
+            self._files = manifest["files"]
+
+    def is_stale(self, in_path, out_path):
+        """
+        :param in_path: a source file
+        :param out_path: the output file we compile it into
+        :return: true iff the source has to be compiled again
+        """
+        entry = self._files.get(os.path.basename(in_path))
+        if entry is None or not os.path.isfile(out_path):
+            return True
+        return entry.get("source") != BuildManifest.hash_file(in_path) or \
+            entry.get("output") != BuildManifest.hash_file(out_path)
+
+    def update(self, in_path, out_path):
+        """
+        records a source file we have just compiled
+        :param in_path: the source file
+        :param out_path: the output file we compiled it into
+        """
+        self._files[os.path.basename(in_path)] = {
+            "source": BuildManifest.hash_file(in_path),
+            "output": BuildManifest.hash_file(out_path)}
+
+    def keep_only(self, in_paths):
+        """
+        forgets the classes that are not part of the build anymore
+        :param in_paths: all the source files of the build
+        """
+        names = {os.path.basename(path) for path in in_paths}
+        for name in list(self._files):
+            if name not in names:
+                del self._files[name]
+
+    def save(self):
+        """
+        writes the manifest next to the output files
+        """
+        temp_path = self._path + "." + str(os.getpid())
+        with open(temp_path, 'w') as manifest_file:
+            json.dump({"version": self._version, "files": self._files},
+                      manifest_file, indent=1, sort_keys=True)
+        os.replace(temp_path, self._path)
+
+    @staticmethod
+    def hash_file(path):
+        """
+        :param path: a file
+        :return: the sha1 of the content of the file (a hex string)
+        """
+        digest = hashlib.sha1()
+        with open(path, 'rb') as in_file:
+            for chunk in iter(lambda: in_file.read(READ_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
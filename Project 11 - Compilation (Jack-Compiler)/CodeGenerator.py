@@ -0,0 +1,871 @@
+import sys
+from JackAST import *
+from Optimizer import *
+from SymbolTable import *
+from VMWriter import *
+
+UNKNOWN_SYMBOL_ERROR = "Unknown Symbol"
+
+BINARY_OPS = {'+': "add", '-': "sub", '=': "eq", '>': "gt", '<': "lt",
+              '&': "and", '|': "or"}
+
+UNARY_OPS = {'-': "neg", '~': "not"}
+
+MAX_CONSTANT = (1 << 15) - 1
+
+# a multiplication or a division by a constant is written as shifts and adds
+# only if it takes at most that many vm commands, a call of the Math class is 3
+MAX_MATH_COMMANDS = 40
+
+# the pool takes a static per string, and all the statics of the program
+# share the 240 words from ram[16], so a class pools that many at most
+MAX_POOLED_STRINGS = 16
+
+# the function that builds the string pool of a class with strinit, a jack
+# name can not have a '$' so it is not taken
+STRING_INIT_FUNCTION = "$strings"
+
+# the segments of the variables a call or a write to an array may change
+SHARED_SEGMENTS = ("static", "this")
+
+
+class CodeGenerator:
+    """
+    The code generator walks the abstract syntax tree of a class (see
+    JackAST) and writes its vm code with a VMWriter
+    """
+
+    def __init__(self, vm_writer, optimizations=None):
+        """
+        A code generator constructor
+        :param vm_writer: the VMWriter we write the vm code with
+        :param optimizations: the names of the optimizations to make (see
+        Optimizer)
+        """
+        self._vm_writer = vm_writer
+        self._optimizations = set(optimizations or [])
+        self._class_table = SymbolTable()
+        self._method_table = SymbolTable()
+        self._cur_class_name = ""
+        self._label_count_while = 0
+        self._label_count_if = 0
+        self._label_count_div = 0
+        self._label_count_str = 0
+        # string constant -> its static in the pool
+        self._string_pool = dict()
+        # with cse, the array address that pointer 1 holds now - the key of
+        # its expression and the variables it reads - or None if not known
+        self._that = None
+
+    def compile_class(self, class_node):
+        """
+        writes the vm code of a class and closes the writer
+        :param class_node: ClassNode
+        """
+        self._cur_class_name = class_node.name
+        for var_dec in class_node.class_vars:
+            for name in var_dec.names:
+                self._class_table.define(name, var_dec.var_type, var_dec.kind)
+        if self._optimizations & {"strpool", "strinit"}:
+            self._make_string_pool(class_node)
+        for subroutine in class_node.subroutines:
+            self.compile_subroutine(subroutine)
+        if "strinit" in self._optimizations and self._string_pool:
+            self._compile_string_init()
+        self._vm_writer.close()
+
+    def compile_subroutine(self, subroutine):
+        """
+        writes the vm code of a subroutine
+        :param subroutine: Subroutine
+        """
+        # re-initialize the method symbol table
+        self._method_table.start_subroutine()
+        self._that = None
+        # method get the as argument the base address of the current object
+        if subroutine.kind == "method":
+            self._method_table.define("this", self._cur_class_name,
+                                      "argument")
+        for param_type, param_name in subroutine.params:
+            self._method_table.define(param_name, param_type, "argument")
+        for var_dec in subroutine.var_decs:
+            for name in var_dec.names:
+                self._method_table.define(name, var_dec.var_type, "local")
+
+        n_locals = self._method_table.var_count("local")
+        self._vm_writer.write_function(
+            self._cur_class_name + '.' + subroutine.name, n_locals)
+
+        if subroutine.kind == "constructor":
+            # allocating memory for the object's fields
+            num_of_fields = self._class_table.var_count("field")
+            self._vm_writer.write_push("constant", num_of_fields)
+            self._vm_writer.write_call("Memory.alloc", 1)
+            # make 'this' to point to address returned by Memory.alloc
+            self._vm_writer.write_pop("pointer", 0)
+
+        if subroutine.kind == "method":
+            # assign pointer[0] to the object's base address in order to
+            # get access to 'this' segment
+            self._vm_writer.write_push("argument", 0)
+            self._vm_writer.write_pop("pointer", 0)
+
+        if "strinit" in self._optimizations and \
+                any(string in self._string_pool
+                    for string in self._find_strings(subroutine)):
+            # build the pool of the class if it was not built yet
+            done_label = self._get_string_label()
+            self._vm_writer.write_push(
+                "static", min(self._string_pool.values()))
+            self._vm_writer.write_if_goto(done_label)
+            self._vm_writer.write_call(
+                self._cur_class_name + '.' + STRING_INIT_FUNCTION, 0)
+            self._vm_writer.write_pop("temp", 0)
+            self._vm_writer.write_label(done_label)
+
+        self.compile_statements(subroutine.statements)
+
+    def compile_statements(self, statements):
+        """
+        writes the vm code of a list of statements
+        :param statements: list of statement nodes
+        """
+        for statement in statements:
+            if isinstance(statement, Let):
+                self.compile_let(statement)
+            elif isinstance(statement, If):
+                self.compile_if(statement)
+            elif isinstance(statement, While):
+                self.compile_while(statement)
+            elif isinstance(statement, Do):
+                self.compile_do(statement)
+            else:
+                self.compile_return(statement)
+
+    def compile_do(self, statement):
+        """
+        writes the do statement, the returned value is thrown away
+        :param statement: Do
+        """
+        self.compile_call(statement.call)
+        self._vm_writer.write_pop("temp", 0)
+
+    def compile_let(self, statement):
+        """
+        writes the let statement
+        :param statement: Let
+        """
+        seg, s_id = self._get_var(statement.name)
+        if statement.index is None:
+            self.compile_expression(statement.value)
+            self._vm_writer.write_pop(seg, s_id)
+            if self._that is not None and (seg, s_id) in self._that[1]:
+                self._that = None
+            return
+        base, offset = self._split_index(statement.index)
+        address = self._get_address(statement.name, base)
+        if address is not None and not (self._is_shared(address) and
+                                        self._makes_call(statement.value)):
+            # the value can not change the address, so it is written first
+            # and pointer[1] is set after it (if it does not point there
+            # already) - no temp[0]
+            self.compile_expression(statement.value)
+            self._compile_that(statement.name, base, address)
+            self._vm_writer.write_pop("that", offset)
+        else:
+            # the address of the cell in the array
+            self._compile_base(statement.name, base)
+            self.compile_expression(statement.value)
+            # save the value in temp[0], the value may have used that segment
+            # so we set pointer[1] only after it was computed
+            self._vm_writer.write_pop("temp", 0)
+            self._vm_writer.write_pop("pointer", 1)
+            self._vm_writer.write_push("temp", 0)
+            self._vm_writer.write_pop("that", offset)
+            self._that = None
+        # the cell may be a static or a field the address was made of
+        if address is not None and self._is_shared(address):
+            self._that = None
+
+    def compile_if(self, statement):
+        """
+        writes the if statement
+        :param statement: If
+        """
+        false_label = self._get_if_label()
+        end_label = self._get_if_label()
+        if "layout" in self._optimizations:
+            # jump over the then on a false condition, and over the else
+            # only if there is one
+            self._compile_branch_false(statement.cond, false_label)
+            cond_that = self._that
+            self.compile_statements(statement.then_statements)
+            if statement.else_statements:
+                self._vm_writer.write_goto(end_label)
+                self._vm_writer.write_label(false_label)
+                self._that = cond_that
+                self.compile_statements(statement.else_statements)
+                self._vm_writer.write_label(end_label)
+            else:
+                self._vm_writer.write_label(false_label)
+            self._that = None
+            return
+        self.compile_expression(statement.cond)
+        self._vm_writer.write_arithmetic("not")
+        self._vm_writer.write_if_goto(false_label)
+        cond_that = self._that
+        self.compile_statements(statement.then_statements)
+        self._vm_writer.write_goto(end_label)
+        self._vm_writer.write_label(false_label)
+        self._that = cond_that
+        if statement.else_statements is not None:
+            self.compile_statements(statement.else_statements)
+        self._vm_writer.write_label(end_label)
+        # both branches get here
+        self._that = None
+
+    def compile_while(self, statement):
+        """
+        writes the while statement
+        :param statement: While
+        """
+        first_label, second_label, body_label = self._get_while_labels()
+        # the loop is entered from before it and from its own end
+        self._that = None
+        if "layout" in self._optimizations and \
+                self._is_boolean(statement.cond):
+            # the test is at the bottom, so an iteration makes one jump
+            self._vm_writer.write_goto(first_label)
+            self._vm_writer.write_label(body_label)
+            self.compile_statements(statement.statements)
+            self._vm_writer.write_label(first_label)
+            self._that = None
+            self._compile_branch_true(statement.cond, body_label)
+            self._that = None
+            return
+        self._vm_writer.write_label(first_label)
+        self.compile_expression(statement.cond)
+        self._vm_writer.write_arithmetic("not")
+        self._vm_writer.write_if_goto(second_label)
+        self.compile_statements(statement.statements)
+        self._vm_writer.write_goto(first_label)
+        self._vm_writer.write_label(second_label)
+        self._that = None
+
+    def _compile_branch_false(self, cond, label):
+        """
+        writes a jump to the label if the condition is false. like
+        "cond, not, if-goto" the condition is true only if it is -1, but a
+        comparison is turned around instead of followed by a not where it
+        can be
+        :param cond: the condition expression
+        :param label: the label to jump to
+        """
+        while isinstance(cond, Group):
+            cond = cond.expr
+        if isinstance(cond, UnaryOp) and cond.op == '~':
+            # ~x is not -1 iff x is not 0
+            self.compile_expression(cond.operand)
+        elif isinstance(cond, BinaryOp) and cond.op == '=':
+            # a = b is false iff a - b is not 0
+            left, right = cond.left, cond.right
+            if constant_value(left) == 0:
+                left, right = right, left
+            self.compile_expression(left)
+            if constant_value(right) != 0:
+                self.compile_expression(right)
+                self._vm_writer.write_arithmetic("sub")
+        elif not (isinstance(cond, BinaryOp) and cond.op in "<>" and
+                  self._compile_inverted_compare(cond)):
+            self.compile_expression(cond)
+            self._vm_writer.write_arithmetic("not")
+        self._vm_writer.write_if_goto(label)
+
+    def _compile_inverted_compare(self, cond):
+        """
+        writes the opposite of a comparison with a constant: a < c is false
+        iff a > c - 1, a > c is false iff a < c + 1 (and the same with the
+        constant on the left)
+        :param cond: BinaryOp of '<' or '>'
+        :return: false if neither side is a constant that can move by one
+        (nothing was written)
+        """
+        right = constant_value(cond.right)
+        left = constant_value(cond.left)
+        if right is not None:
+            operand, shift = cond.left, -1 if cond.op == '<' else 1
+            value = right + shift
+        elif left is not None:
+            operand, shift = cond.right, 1 if cond.op == '<' else -1
+            value = left + shift
+        else:
+            return False
+        if not -MAX_CONSTANT - 1 <= value <= MAX_CONSTANT:
+            return False
+        self.compile_expression(operand)
+        self._compile_int(value)
+        self._vm_writer.write_arithmetic("gt" if shift < 0 else "lt")
+        return True
+
+    def _compile_branch_true(self, cond, label):
+        """
+        writes a jump to the label if a boolean condition is true
+        :param cond: the condition expression, _is_boolean of it is true
+        :param label: the label to jump to
+        """
+        while isinstance(cond, Group):
+            cond = cond.expr
+        if isinstance(cond, UnaryOp):  # ~x is true iff x is false
+            self._compile_branch_false(cond.operand, label)
+            return
+        self.compile_expression(cond)
+        self._vm_writer.write_if_goto(label)
+
+    @staticmethod
+    def _is_boolean(expr):
+        """
+        :param expr: an expression node
+        :return: true if the value of the expression is surely 0 or -1 -
+        a comparison, true or false, or ~, & and | of those
+        """
+        while isinstance(expr, Group):
+            expr = expr.expr
+        if isinstance(expr, BinaryOp):
+            if expr.op in "<>=":
+                return True
+            return expr.op in "&|" and CodeGenerator._is_boolean(
+                expr.left) and CodeGenerator._is_boolean(expr.right)
+        if isinstance(expr, UnaryOp):
+            return expr.op == '~' and CodeGenerator._is_boolean(expr.operand)
+        return constant_value(expr) in (0, -1)
+
+    def compile_return(self, statement):
+        """
+        writes the return statement, a void subroutine returns 0
+        :param statement: Return
+        """
+        if statement.value is None:
+            self._vm_writer.write_push("constant", 0)
+        else:
+            self.compile_expression(statement.value)
+        self._vm_writer.write_return()
+
+    def compile_call(self, call):
+        """
+        writes a subroutine call
+        :param call: Call
+        """
+        num_of_args = len(call.args)
+        if call.receiver is None:
+            # a method of the current object
+            cur_name = self._cur_class_name + '.' + call.name
+            num_of_args += 1
+            self._vm_writer.write_push("pointer", 0)
+        else:
+            symbol_info = self._get_symbol_info(call.receiver)
+            if symbol_info is None:  # a function of another class
+                cur_name = call.receiver + '.' + call.name
+            else:  # a method of the object in a variable
+                type_of, kind_of, id_of = symbol_info
+                num_of_args += 1
+                self._vm_writer.write_push(self._get_segment(kind_of), id_of)
+                cur_name = type_of + '.' + call.name
+        for arg in call.args:
+            self.compile_expression(arg)
+        self._write_call(cur_name, num_of_args)
+
+    def compile_expression(self, expr):
+        """
+        writes an expression, the operands first and then the operator
+        so it is evaluated as a postfix expression
+        :param expr: an expression node
+        """
+        if isinstance(expr, BinaryOp):
+            if expr.op in MATH_OPS:
+                self._compile_math(expr)
+                return
+            self.compile_expression(expr.left)
+            self.compile_expression(expr.right)
+            self._vm_writer.write_arithmetic(BINARY_OPS[expr.op])
+        elif isinstance(expr, UnaryOp):
+            self.compile_expression(expr.operand)
+            self._vm_writer.write_arithmetic(UNARY_OPS[expr.op])
+        elif isinstance(expr, Group):
+            self.compile_expression(expr.expr)
+        elif isinstance(expr, IntConst):
+            self._compile_int(expr.value)
+        elif isinstance(expr, StringConst):
+            self._compile_string(expr.value)
+        elif isinstance(expr, KeywordConst):
+            self._compile_const_keyword(expr.word)
+        elif isinstance(expr, VarRef):
+            self._vm_writer.write_push(*self._get_var(expr.name))
+        elif isinstance(expr, ArrayRef):
+            base, offset = self._split_index(expr.index)
+            self._compile_that(expr.name, base,
+                               self._get_address(expr.name, base))
+            self._vm_writer.write_push("that", offset)
+        else:
+            self.compile_call(expr)
+
+    def _split_index(self, index):
+        """
+        with offsets, a constant index k or an index i + k (k + i) is split
+        so that pointer[1] points at array + i and the cell is that k
+        :param index: the index expression
+        :return: the index expression pointer[1] is set by (None for the
+        array itself) and the offset of the cell in the that segment
+        """
+        if "offsets" in self._optimizations:
+            value = constant_value(index)
+            if value is not None and 0 <= value <= MAX_CONSTANT:
+                return None, value
+            if isinstance(index, BinaryOp) and index.op == '+':
+                value = constant_value(index.right)
+                if value is not None and 0 <= value <= MAX_CONSTANT:
+                    return index.left, value
+                value = constant_value(index.left)
+                if value is not None and 0 <= value <= MAX_CONSTANT:
+                    return index.right, value
+        return index, 0
+
+    def _compile_base(self, name, base):
+        """
+        writes the address pointer[1] is set to for an array cell
+        :param name: the name of the array variable
+        :param base: the index expression, None for the array itself
+        """
+        self._vm_writer.write_push(*self._get_var(name))
+        if base is not None:
+            self.compile_expression(base)
+            self._vm_writer.write_arithmetic("add")
+
+    def _compile_that(self, name, base, address):
+        """
+        sets pointer[1] for a cell of an array, unless it already points
+        there (with cse)
+        :param name: the name of the array variable
+        :param base: the index expression, None for the array itself
+        :param address: what _get_address returned for them
+        """
+        if address is None or self._that is None or \
+                self._that[0] != address[0]:
+            self._compile_base(name, base)
+            self._vm_writer.write_pop("pointer", 1)
+        self._that = address
+
+    def _get_address(self, name, base):
+        """
+        :param name: the name of an array variable
+        :param base: the index expression, None for the array itself
+        :return: with cse, the key of the address array + base and the set
+        of the variables (segment, index) it reads. None if cse is off or
+        the index may have side effects or move pointer[1] - only
+        variables, constants and the operators that are not calls
+        """
+        if "cse" not in self._optimizations:
+            return None
+        variables = set()
+
+        def get_key(expr):
+            if isinstance(expr, Group):
+                return get_key(expr.expr)
+            if isinstance(expr, (IntConst, KeywordConst)):
+                return expr.__class__.__name__, constant_value(expr)
+            if isinstance(expr, VarRef):
+                variables.add(self._get_var(expr.name))
+                return ("var",) + self._get_var(expr.name)
+            if isinstance(expr, UnaryOp):
+                operand = get_key(expr.operand)
+                return None if operand is None else (expr.op, operand)
+            if isinstance(expr, BinaryOp) and expr.op in BINARY_OPS:
+                left, right = get_key(expr.left), get_key(expr.right)
+                if left is None or right is None:
+                    return None
+                return expr.op, left, right
+            return None  # this, strings, arrays and calls
+
+        if base is None:
+            key = get_key(VarRef(name))
+        else:
+            key = get_key(BinaryOp('+', VarRef(name), base))
+        return None if key is None else (key, variables)
+
+    @staticmethod
+    def _is_shared(address):
+        """
+        :param address: an address as _get_address returns it
+        :return: true if it reads a static or a field, that a call or a
+        write to an array may change
+        """
+        return any(seg in SHARED_SEGMENTS for seg, s_id in address[1])
+
+    @staticmethod
+    def _makes_call(expr):
+        """
+        :param expr: an expression node
+        :return: true if writing the expression may call a subroutine
+        """
+        calls = []
+
+        def check(sub_expr):
+            if calls_subroutine(sub_expr):
+                calls.append(sub_expr)
+            return sub_expr
+
+        map_expression(expr, check)
+        return bool(calls)
+
+    def _write_call(self, name, n_args):
+        """
+        writes a call, that may change the statics and the fields, so
+        pointer[1] is not known after it if its address reads them
+        :param name: the name of the subroutine
+        :param n_args: int
+        """
+        self._vm_writer.write_call(name, n_args)
+        if self._that is not None and self._is_shared(self._that):
+            self._that = None
+
+    def _compile_math(self, expr):
+        """
+        writes a multiplication or a division, by shifts and adds if the
+        strength optimization is on and one of the operands is a constant
+        that makes it worth it, by a call of the Math class otherwise
+        :param expr: BinaryOp of '*' or '/'
+        """
+        if "strength" in self._optimizations:
+            right = constant_value(expr.right)
+            if expr.op == '/':
+                if right is not None and \
+                        self._compile_divide(expr.left, right):
+                    return
+            elif right is not None and \
+                    self._compile_multiply(expr.left, right):
+                return
+            else:
+                left = constant_value(expr.left)
+                if left is not None and \
+                        self._compile_multiply(expr.right, left):
+                    return
+        self.compile_expression(expr.left)
+        self.compile_expression(expr.right)
+        self._write_call(MATH_OPS[expr.op], 2)
+
+    def _compile_multiply(self, operand, value):
+        """
+        writes operand * value as shifts and adds (horner's rule over the
+        bits of the value - double the sum and add the operand for every 1
+        bit). the operand is pushed from its variable or from temp 1 and
+        the sum is doubled through temp 2
+        :param operand: the expression we multiply
+        :param value: the 16-bit constant we multiply by
+        :return: false if it is cheaper to call Math.multiply (nothing was
+        written)
+        """
+        # the bits of the value as is, or of -value with a neg at the end
+        bits, negate = value % WORD, False
+        if value < 0 and self._multiply_cost(-value) < \
+                self._multiply_cost(bits):
+            bits, negate = -value, True
+        if self._multiply_cost(bits) > MAX_MATH_COMMANDS:
+            return False
+        is_var = isinstance(operand, VarRef)
+        if bits == 0:
+            if is_var:
+                self._vm_writer.write_push("constant", 0)
+            else:  # the operand may have side effects
+                self.compile_expression(operand)
+                self._vm_writer.write_push("constant", 0)
+                self._vm_writer.write_arithmetic("and")
+            return True
+
+        source = None
+        if is_var:
+            source = self._get_var(operand.name)
+        elif bits & (bits - 1):  # we need the operand more than once
+            self.compile_expression(operand)
+            source = ("temp", 1)
+            self._vm_writer.write_pop(*source)
+        if source is None:
+            self.compile_expression(operand)
+        else:
+            self._vm_writer.write_push(*source)
+        is_operand = source is not None
+        for bit in bin(bits)[3:]:
+            if is_operand:  # operand + operand
+                self._vm_writer.write_push(*source)
+            else:
+                self._vm_writer.write_pop("temp", 2)
+                self._vm_writer.write_push("temp", 2)
+                self._vm_writer.write_push("temp", 2)
+            self._vm_writer.write_arithmetic("add")
+            is_operand = False
+            if bit == '1':
+                self._vm_writer.write_push(*source)
+                self._vm_writer.write_arithmetic("add")
+        if negate:
+            self._vm_writer.write_arithmetic("neg")
+        return True
+
+    @staticmethod
+    def _multiply_cost(bits):
+        """
+        :param bits: an unsigned 16-bit constant
+        :return: about how many vm commands a multiplication by it takes
+        """
+        return 4 * max(bits.bit_length() - 1, 0) + \
+            2 * max(bin(bits).count('1') - 1, 0)
+
+    def _compile_divide(self, operand, value):
+        """
+        writes operand / value for a value that is a power of two (or minus
+        one), as Math.divide does - the bits of |operand| from log(value)
+        up are moved down one by one and the sign is put back, so the
+        result is truncated towards zero. it is the result of Math.divide
+        wherever Math.divide returns at all (it never does for a dividend
+        from 16384 up)
+        :param operand: the expression we divide
+        :param value: the 16-bit constant we divide by
+        :return: false if it is not a power of two or if it is cheaper to call
+        Math.divide (nothing was written)
+        """
+        divisor = abs(value)
+        if value == 0 or value == -MAX_CONSTANT - 1 or \
+                divisor & (divisor - 1):
+            return False
+        shift = divisor.bit_length() - 1
+        if self._divide_cost(shift) > MAX_MATH_COMMANDS:
+            return False
+        self.compile_expression(operand)
+        if shift > 0:
+            pos_label, end_label = self._get_div_labels()
+            # temp 1 = |operand| and temp 2 = true iff it was negative
+            self._vm_writer.write_pop("temp", 1)
+            self._vm_writer.write_push("temp", 1)
+            self._vm_writer.write_push("constant", 0)
+            self._vm_writer.write_arithmetic("lt")
+            self._vm_writer.write_pop("temp", 2)
+            self._vm_writer.write_push("temp", 2)
+            self._vm_writer.write_arithmetic("not")
+            self._vm_writer.write_if_goto(pos_label)
+            self._vm_writer.write_push("temp", 1)
+            self._vm_writer.write_arithmetic("neg")
+            self._vm_writer.write_pop("temp", 1)
+            self._vm_writer.write_label(pos_label)
+            for i in range(shift, 15):
+                # (|operand| & 2^i > 0) & 2^(i - shift)
+                self._vm_writer.write_push("temp", 1)
+                self._vm_writer.write_push("constant", 1 << i)
+                self._vm_writer.write_arithmetic("and")
+                self._vm_writer.write_push("constant", 0)
+                self._vm_writer.write_arithmetic("gt")
+                self._vm_writer.write_push("constant", 1 << (i - shift))
+                self._vm_writer.write_arithmetic("and")
+                if i > shift:
+                    self._vm_writer.write_arithmetic("add")
+            self._vm_writer.write_push("temp", 2)
+            self._vm_writer.write_arithmetic("not")
+            self._vm_writer.write_if_goto(end_label)
+            self._vm_writer.write_arithmetic("neg")
+            self._vm_writer.write_label(end_label)
+        if value < 0:
+            self._vm_writer.write_arithmetic("neg")
+        return True
+
+    @staticmethod
+    def _divide_cost(shift):
+        """
+        :param shift: log of the power of two we divide by
+        :return: how many vm commands a division by it takes, 8 for every
+        bit that is moved down and 16 to take the sign off and put it back
+        """
+        if shift == 0:
+            return 0
+        return 16 + 8 * (15 - shift)
+
+    def _compile_int(self, value):
+        """
+        writes an int constant, the folded constants may be any 16-bit
+        value but push constant takes only 0..32767
+        :param value: int
+        """
+        if 0 <= value <= MAX_CONSTANT:
+            self._vm_writer.write_push("constant", value)
+        elif value == -1:  # as true
+            self._vm_writer.write_push("constant", 0)
+            self._vm_writer.write_arithmetic("not")
+        elif value == -MAX_CONSTANT - 1:
+            self._vm_writer.write_push("constant", MAX_CONSTANT)
+            self._vm_writer.write_arithmetic("not")
+        else:
+            self._vm_writer.write_push("constant", -value)
+            self._vm_writer.write_arithmetic("neg")
+
+    def _compile_const_keyword(self, key_word):
+        """
+        writes a constant keyword
+        :param key_word: string from {'true', 'false', 'null', 'this'}
+        """
+        if key_word == "this":
+            self._vm_writer.write_push("pointer", 0)
+        else:
+            self._vm_writer.write_push("constant", 0)
+        if key_word == "true":
+            self._vm_writer.write_arithmetic("not")
+
+    def _compile_string(self, string):
+        """
+        writes a string constant. a pooled string is pushed from its static
+        (with strpool it is built there at its first use), otherwise it is
+        a new String every time
+        :param string: the string without the quotes
+        """
+        slot = self._string_pool.get(string)
+        if slot is None:
+            self._compile_new_string(string)
+            return
+        if "strinit" not in self._optimizations:
+            done_label = self._get_string_label()
+            self._vm_writer.write_push("static", slot)
+            self._vm_writer.write_if_goto(done_label)
+            self._compile_new_string(string)
+            self._vm_writer.write_pop("static", slot)
+            self._vm_writer.write_label(done_label)
+        self._vm_writer.write_push("static", slot)
+
+    def _make_string_pool(self, class_node):
+        """
+        gives the string constants of the class their statics, after the
+        statics the class declares
+        :param class_node: ClassNode
+        """
+        first_slot = self._class_table.var_count("static")
+        for subroutine in class_node.subroutines:
+            for string in self._find_strings(subroutine):
+                if string not in self._string_pool and \
+                        len(self._string_pool) < MAX_POOLED_STRINGS:
+                    self._string_pool[string] = \
+                        first_slot + len(self._string_pool)
+
+    @staticmethod
+    def _find_strings(subroutine):
+        """
+        :param subroutine: Subroutine
+        :return: the string constants of the subroutine in the order they
+        appear
+        """
+        strings = []
+
+        def find(expr):
+            if isinstance(expr, StringConst):
+                strings.append(expr.value)
+            return expr
+
+        map_statements(subroutine.statements, find)
+        return strings
+
+    def _compile_string_init(self):
+        """
+        writes the function that builds the whole string pool of the class,
+        every string is built in one place and its uses only push it
+        """
+        self._vm_writer.write_function(
+            self._cur_class_name + '.' + STRING_INIT_FUNCTION, 0)
+        for string, slot in self._string_pool.items():
+            self._compile_new_string(string)
+            self._vm_writer.write_pop("static", slot)
+        self._vm_writer.write_push("constant", 0)
+        self._vm_writer.write_return()
+
+    def _compile_new_string(self, string):
+        """
+        writes a new String with the chars of a string constant appended
+        :param string: the string without the quotes
+        """
+        self._vm_writer.write_push("constant", len(string))
+        self._write_call("String.new", 1)
+        for c in string:
+            self._vm_writer.write_push("constant", ord(c))
+            self._write_call("String.appendChar", 2)
+
+    def _get_var(self, name):
+        """
+        :param name: the name of a variable
+        :return: the segment and the index of the variable. prints unknown
+        symbol error if it is not declared and exits the program
+        """
+        info = self._get_symbol_info(name)
+        if info is None:
+            print(UNKNOWN_SYMBOL_ERROR)
+            sys.exit()
+        s_type, s_kind, s_id = info
+        return self._get_segment(s_kind), s_id
+
+    def _get_symbol_info(self, symbol_name):
+        """
+        first checks if the given symbol in the method symbol table
+        if the method table contains the symbol it returns it's information:
+        (type,kind,id)
+        otherwise check if the class symbol table contains the symbol
+        if it does it return the symbol information from the class table
+        else returns None
+        :param symbol_name: string
+        """
+        info = self._method_table.get_info(symbol_name)
+        if info is None:
+            info = self._class_table.get_info(symbol_name)
+        return info
+
+    @staticmethod
+    def _get_segment(cur_kind):
+        """
+        :param cur_kind: Jack kind - from the list:
+         ["var", "argument", "field", "class", "subroutine", "local", "static"]
+        :return: if the given kind is "field" it returns 'this'
+        otherwise returns the given kind
+        """
+        if cur_kind == "field":
+            return "this"
+        else:
+            return cur_kind
+
+    def _get_if_label(self):
+        """
+        create new if label and increment the if label counter
+        :return: if unused label
+        """
+        curr_counter = str(self._label_count_if)
+        self._label_count_if += 1
+        return "IF" + curr_counter
+
+    def _get_while_labels(self):
+        """
+        creates the labels of a while statement and increments the while
+        label counter
+        :return: unused while label, end while label and while body label
+        """
+        curr_counter = str(self._label_count_while)
+        self._label_count_while += 1
+        return "WHILE" + curr_counter, "WHILE_END" + curr_counter, \
+            "WHILE_BODY" + curr_counter
+
+    def _get_div_labels(self):
+        """
+        creates the labels of a division by a power of two and increments
+        the division label counter
+        :return: unused label for a positive dividend and end label
+        """
+        curr_counter = str(self._label_count_div)
+        self._label_count_div += 1
+        return "DIV_POS" + curr_counter, "DIV_END" + curr_counter
+
+    def _get_string_label(self):
+        """
+        create new label for a built string pool check and increment the
+        string label counter
+        :return: unused string label
+        """
+        curr_counter = str(self._label_count_str)
+        self._label_count_str += 1
+        return "STR" + curr_counter
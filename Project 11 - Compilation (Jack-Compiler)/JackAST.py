@@ -0,0 +1,243 @@
+"""
+the nodes of the abstract syntax tree the compilation engine builds for a
+jack class. every node keeps only what the grammar needs (names, types,
+operators and sub nodes) in __slots__, so a tree costs a few small objects
+per construct and passes can rewrite it in place
+"""
+
+
+class ClassNode:
+    __slots__ = ("name", "class_vars", "subroutines")
+
+    def __init__(self, name, class_vars, subroutines):
+        """
+        :param name: the name of the class
+        :param class_vars: list of ClassVarDec
+        :param subroutines: list of Subroutine
+        """
+        self.name = name
+        self.class_vars = class_vars
+        self.subroutines = subroutines
+
+
+class ClassVarDec:
+    __slots__ = ("kind", "var_type", "names")
+
+    def __init__(self, kind, var_type, names):
+        """
+        :param kind: 'static' or 'field'
+        :param var_type: the type of the variables
+        :param names: list of the names declared
+        """
+        self.kind = kind
+        self.var_type = var_type
+        self.names = names
+
+
+class Subroutine:
+    __slots__ = ("kind", "return_type", "name", "params", "var_decs",
+                 "statements")
+
+    def __init__(self, kind, return_type, name, params, var_decs,
+                 statements):
+        """
+        :param kind: 'constructor', 'function' or 'method'
+        :param return_type: the return type (or 'void')
+        :param name: the name of the subroutine
+        :param params: list of (type, name) pairs
+        :param var_decs: list of VarDec
+        :param statements: list of statements
+        """
+        self.kind = kind
+        self.return_type = return_type
+        self.name = name
+        self.params = params
+        self.var_decs = var_decs
+        self.statements = statements
+
+
+class VarDec:
+    __slots__ = ("var_type", "names")
+
+    def __init__(self, var_type, names):
+        """
+        :param var_type: the type of the local variables
+        :param names: list of the names declared
+        """
+        self.var_type = var_type
+        self.names = names
+
+
+# statements
+
+
+class Let:
+    __slots__ = ("name", "index", "value")
+
+    def __init__(self, name, index, value):
+        """
+        let name = value; or let name[index] = value;
+        :param name: the variable we assign to
+        :param index: the index expression or None if it is not an array
+        :param value: the expression we assign
+        """
+        self.name = name
+        self.index = index
+        self.value = value
+
+
+class If:
+    __slots__ = ("cond", "then_statements", "else_statements")
+
+    def __init__(self, cond, then_statements, else_statements):
+        """
+        :param cond: the condition expression
+        :param then_statements: list of statements
+        :param else_statements: list of statements or None if there is no
+        else
+        """
+        self.cond = cond
+        self.then_statements = then_statements
+        self.else_statements = else_statements
+
+
+class While:
+    __slots__ = ("cond", "statements")
+
+    def __init__(self, cond, statements):
+        """
+        :param cond: the condition expression
+        :param statements: list of statements of the body
+        """
+        self.cond = cond
+        self.statements = statements
+
+
+class Do:
+    __slots__ = ("call",)
+
+    def __init__(self, call):
+        """
+        :param call: the Call we make
+        """
+        self.call = call
+
+
+class Return:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        """
+        :param value: the expression we return or None
+        """
+        self.value = value
+
+
+# expressions and terms
+
+
+class BinaryOp:
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op, left, right):
+        """
+        jack has no operator precedence - a op b op c is (a op b) op c
+        :param op: the operator symbol (+, -, *, /, &, |, <, >, =)
+        :param left: the left operand
+        :param right: the right operand
+        """
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class UnaryOp:
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op, operand):
+        """
+        :param op: '-' or '~'
+        :param operand: the term the operator is applied to
+        """
+        self.op = op
+        self.operand = operand
+
+
+class Group:
+    __slots__ = ("expr",)
+
+    def __init__(self, expr):
+        """
+        an expression in brackets - it only matters for the xml output
+        :param expr: the expression within the brackets
+        """
+        self.expr = expr
+
+
+class IntConst:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        """
+        :param value: int
+        """
+        self.value = value
+
+
+class StringConst:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        """
+        :param value: the string without the quotes
+        """
+        self.value = value
+
+
+class KeywordConst:
+    __slots__ = ("word",)
+
+    def __init__(self, word):
+        """
+        :param word: 'true', 'false', 'null' or 'this'
+        """
+        self.word = word
+
+
+class VarRef:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        """
+        :param name: the name of the variable
+        """
+        self.name = name
+
+
+class ArrayRef:
+    __slots__ = ("name", "index")
+
+    def __init__(self, name, index):
+        """
+        name[index]
+        :param name: the name of the array variable
+        :param index: the index expression
+        """
+        self.name = name
+        self.index = index
+
+
+class Call:
+    __slots__ = ("receiver", "name", "args")
+
+    def __init__(self, receiver, name, args):
+        """
+        receiver.name(args) or name(args)
+        :param receiver: a class or variable name, None for a method of the
+        current object
+        :param name: the name of the subroutine
+        :param args: list of the argument expressions
+        """
+        self.receiver = receiver
+        self.name = name
+        self.args = args
@@ -0,0 +1,255 @@
+#!/bin/bash
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+from CompilationEngine import *
+
+# the shapes of the synthetic classes we generate
+NESTED = "nested"
+SUBROUTINES = "subroutines"
+STRINGS = "strings"
+COMMENTS = "comments"
+SHAPES = [NESTED, SUBROUTINES, STRINGS, COMMENTS]
+
+SIZES = {"small": 50, "medium": 400, "large": 2000}
+
+DEFAULT_REPEAT = 3
+
+DEFAULT_SEED = 2016
+
+OPERATORS = ['+', '-', '*', '/', '&', '|', '<', '>', '=']
+
+NAMES = ["a", "b", "c", "d"]
+
+STRING_CHARS = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+class JackCorpus:
+    """
+    generates grammatically valid jack classes of a given shape and size
+    """
+
+    def __init__(self, seed=DEFAULT_SEED):
+        """
+        :param seed: the seed of the random generator, the same seed always
+        gives the same corpus
+        """
+        self._random = random.Random(seed)
+
+    def make_class(self, name, shape, size):
+        """
+        :param name: the name of the class
+        :param shape: one of SHAPES
+        :param size: how many subroutines (or expressions) the class has
+        :return: the text of the class
+        """
+        lines = ["class " + name + " {", "    static int counter;"]
+        if shape == SUBROUTINES:
+            for i in range(size):
+                lines.extend(self._subroutine("f" + str(i), 1))
+        elif shape == NESTED:
+            for i in range(max(1, size // 10)):
+                lines.extend(self._subroutine("f" + str(i), 10, depth=8))
+        elif shape == STRINGS:
+            for i in range(max(1, size // 10)):
+                lines.extend(self._string_subroutine("f" + str(i), 10))
+        else:
+            for i in range(size):
+                lines.extend(self._comment_block())
+                lines.extend(self._subroutine("f" + str(i), 1))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def _subroutine(self, name, statements, depth=2):
+        """
+        :return: the lines of a function with the given number of let
+        statements, each one with an expression nested up to the depth
+        """
+        lines = ["    function int " + name + "(int a, int b) {",
+                 "        var int c, d;",
+                 "        var Array arr;",
+                 "        let arr = Array.new(10);"]
+        for i in range(statements):
+            lines.append("        let c = " + self._expression(depth) + ";")
+            lines.append("        while (c < 10) {")
+            lines.append("            let arr[c] = d + " +
+                         self._expression(1) + ";")
+            lines.append("            let c = c + 1;")
+            lines.append("        }")
+            lines.append("        if (c = d) {")
+            lines.append("            do Output.printInt(c);")
+            lines.append("        } else {")
+            lines.append("            let counter = counter + 1;")
+            lines.append("        }")
+        lines.append("        return c;")
+        lines.append("    }")
+        return lines
+
+    def _string_subroutine(self, name, statements):
+        """
+        :return: the lines of a function printing long string constants
+        """
+        lines = ["    function void " + name + "() {"]
+        for i in range(statements):
+            length = self._random.randint(40, 120)
+            text = "".join(self._random.choice(STRING_CHARS)
+                           for _ in range(length))
+            lines.append("        do Output.printString(\"" + text + "\");")
+        lines.append("        return;")
+        lines.append("    }")
+        return lines
+
+    def _comment_block(self):
+        """
+        :return: the lines of a block comment and some line comments
+        """
+        lines = ["    /**", "     * " + "documentation " * 6]
+        lines.extend("     * line " + str(i) for i in range(8))
+        lines.append("     */")
+        lines.extend("    // " + "comment " * 8 for _ in range(4))
+        return lines
+
+    def _expression(self, depth):
+        """
+        :param depth: how deep the expression is nested
+        :return: the text of a random expression
+        """
+        if depth == 0:
+            choice = self._random.randint(0, 3)
+            if choice == 0:
+                return str(self._random.randint(0, 1000))
+            if choice == 1:
+                return self._random.choice(NAMES)
+            if choice == 2:
+                return "arr[" + self._random.choice(NAMES) + "]"
+            return "Math.max(" + self._random.choice(NAMES) + ", 3)"
+        left = self._expression(depth - 1)
+        right = self._expression(self._random.randint(0, depth - 1))
+        operator = self._random.choice(OPERATORS)
+        if self._random.randint(0, 4) == 0:
+            return "-(" + left + " " + operator + " " + right + ")"
+        return "(" + left + " " + operator + " " + right + ")"
+
+
+def write_corpus(directory, sizes, seed):
+    """
+    writes a class of every shape and size in the directory
+    :return: list of (shape, size name, path) of the written classes
+    """
+    corpus = JackCorpus(seed)
+    classes = []
+    for shape in SHAPES:
+        for size_name in sizes:
+            name = shape.capitalize() + size_name.capitalize()
+            path = os.path.join(directory, name + ".jack")
+            with open(path, 'w') as out_file:
+                out_file.write(corpus.make_class(name, shape,
+                                                 SIZES[size_name]))
+            classes.append((shape, size_name, path))
+    return classes
+
+
+def time_tokenizer(path, repeat):
+    """
+    :return: the best time (seconds) to tokenize the file and the number of
+    tokens in it
+    """
+    best = None
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokenizer = JackTokenizer(path, whole_file=True)
+        tokens = 0
+        while tokenizer.has_more_tokens():
+            tokenizer.advance()
+            tokenizer.token_type()
+            tokens += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, tokens
+
+
+def time_compile_class(path, out_path, repeat):
+    """
+    :return: the best time (seconds) of CompilationEngine.compile_class on
+    the file, the tokenizing included
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine = CompilationEngine(path, out_path)
+        engine.compile_class()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def git_commit():
+    """
+    :return: the current git commit of the working tree or None
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, repeat, seed):
+    """
+    generates the corpus and times the tokenizer and the compilation engine
+    on every class of it
+    :return: the results as a dictionary ready to be saved as json
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shape, size_name, path in write_corpus(directory, sizes, seed):
+            with open(path) as in_file:
+                lines = sum(1 for _ in in_file)
+            tokenize_time, tokens = time_tokenizer(path, repeat)
+            compile_time = time_compile_class(path, path[:-5] + ".vm",
+                                              repeat)
+            results.append({
+                "shape": shape,
+                "size": size_name,
+                "bytes": os.path.getsize(path),
+                "lines": lines,
+                "tokens": tokens,
+                "tokenizer_seconds": tokenize_time,
+                "tokenizer_tokens_per_sec": tokens / tokenize_time,
+                "tokenizer_lines_per_sec": lines / tokenize_time,
+                "compile_seconds": compile_time,
+                "compile_tokens_per_sec": tokens / compile_time,
+                "compile_lines_per_sec": lines / compile_time,
+            })
+    return {"commit": git_commit(), "python": platform.python_version(),
+            "repeat": repeat, "seed": seed, "results": results}
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description="times the tokenizer and the compilation engine on a "
+                    "synthetic jack corpus")
+    arg_parser.add_argument("-o", "--output", help="the json file to write "
+                                                   "the results to (default: "
+                                                   "standard output)")
+    arg_parser.add_argument("--sizes", nargs="+", choices=list(SIZES),
+                            default=list(SIZES))
+    arg_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                            help="how many times to time every class (the "
+                                 "best time is kept)")
+    arg_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = arg_parser.parse_args()
+    report = run_benchmarks(args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -1,11 +1,48 @@
 #!/bin/bash
+import argparse
+import contextlib
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
+from BuildManifest import BuildManifest
 from CompilationEngine import *
+from Optimizer import DEFAULT_OPTIMIZATIONS, parse_optimizations
+from TokenCache import TokenCache
 
 INVALID_INPUT_ERROR = "Invalid input file"
 
-NUM_OF_ARG = 2
-ARG_ERROR = "Wrong Number of args"
+COMPILE_FAILED_ERROR = "compilation failed"
+
+COMPILER_VERSION = "1.3"
+
+
+def compile_file(in_path, out_path, cache_dir, xml_path=None,
+                 optimizations=None, peephole_rules=PEEPHOLE_RULE_NAMES):
+    """
+    compiles a single jack file, this is what every worker process runs in
+    parallel mode. the engine reports errors by printing them and exiting,
+    so we catch the exit and keep what it printed
+    :param in_path: the jack file to compile
+    :param out_path: the vm file to write
+    :param cache_dir: the directory of the token cache or None
+    :param xml_path: the xml file to write the parse tree into or None
+    :param optimizations: the names of the optimizations to make
+    :param peephole_rules: the names of the peephole rules to run
+    :return: the error message of the file or None if it compiled, and the
+    peephole rule hits of the file
+    """
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            cache = None
+            if cache_dir is not None:
+                cache = TokenCache(cache_dir, COMPILER_VERSION)
+            engine = CompilationEngine(in_path, out_path, cache, xml_path,
+                                       optimizations, peephole_rules)
+            engine.compile_class()
+    except SystemExit:
+        return output.getvalue().strip() or COMPILE_FAILED_ERROR, dict()
+    return None, engine.peephole_stats
 
 
 class JackAnalyzer:
@@ -13,26 +50,150 @@ class JackAnalyzer:
     The Jack analyzer class runs the show
     """
 
-    def __init__(self, path):
+    def __init__(self, path, use_cache=True, xml=False,
+                 optimizations=DEFAULT_OPTIMIZATIONS,
+                 peephole_rules=PEEPHOLE_RULE_NAMES):
         """
         constructor for the Jack Analyzer
         :param path: the path of the file / directory we wish to compile
+        :param use_cache: if true the tokens of every file are cached next to
+        the output files, so unchanged files are not tokenized again
+        :param xml: if true the parse tree of every class is also written
+        into an xml file (the output of project 10) next to its vm file
+        :param optimizations: the names of the optimizations to make (see
+        Optimizer)
+        :param peephole_rules: the names of the rules of the peephole
+        optimization (see VMWriter)
         """
         self._in_path = path
         self._out_path = path
+        self._use_cache = use_cache
+        self._xml = xml
+        self._optimizations = list(optimizations)
+        self._peephole_rules = list(peephole_rules)
+        # how many times every peephole rule and the jump threading matched
+        # in all the classes
+        self.peephole_stats = dict.fromkeys(STAT_NAMES, 0)
         self._inputs = self._get_paths()
 
-    def create_out(self):
+    def create_out(self, jobs=1, incremental=False):
         """
         creates the output files - first we get the output file name and
         then  we create a compilation engine with our in file and out file
         and the engine compiles the infile and saves the output in
         the output file
+        :param jobs: the number of processes to compile the files with, every
+        class compiles into its own vm file so they are independent
+        :param incremental: if true only the files whose source changed or
+        whose vm file is missing or stale (according to the build manifest
+        next to the outputs) are compiled
+        """
+        files = self._inputs
+        if self._use_cache and os.path.isdir(self._in_path):
+            # all the files of the cache are compiled here
+            TokenCache(self._out_path, COMPILER_VERSION).keep_only(files)
+        manifest = None
+        if incremental:
+            manifest = BuildManifest(self._out_path, self._build_version())
+            manifest.keep_only(files)
+            files = [file for file in files
+                     if manifest.is_stale(file, self._get_out_name(file)) or
+                     (self._xml and
+                      not os.path.isfile(self._get_xml_name(file)))]
+        try:
+            if jobs > 1 and len(files) > 1:
+                self._create_out_parallel(files, jobs, manifest)
+            else:
+                self._create_out_serial(files, manifest)
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+    def _create_out_serial(self, files, manifest):
+        """
+        compiles the files one after the other
+        :param files: the jack files to compile
+        :param manifest: the BuildManifest to record the compiled files in
+        or None
         """
-        for file in self._inputs:
-            out_name = str(os.path.basename(file).split('.')[0]) + ".vm"
-            comp = CompilationEngine(file, self._out_path + "/" + out_name)
+        cache = None
+        if self._use_cache:
+            cache = TokenCache(self._out_path, COMPILER_VERSION)
+        for file in files:
+            comp = CompilationEngine(file, self._get_out_name(file), cache,
+                                     self._get_xml_name(file),
+                                     self._optimizations,
+                                     self._peephole_rules)
             comp.compile_class()
+            self._add_stats(comp.peephole_stats)
+            if manifest is not None:
+                manifest.update(file, self._get_out_name(file))
+
+    def _create_out_parallel(self, files, jobs, manifest):
+        """
+        compiles the files in a pool of processes, the errors are reported
+        per file once all of them are done
+        :param files: the jack files to compile
+        :param jobs: the number of processes
+        :param manifest: the BuildManifest to record the compiled files in
+        or None
+        """
+        cache_dir = self._out_path if self._use_cache else None
+        out_names = [self._get_out_name(file) for file in files]
+        xml_names = [self._get_xml_name(file) for file in files]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(compile_file, files, out_names,
+                                    [cache_dir] * len(files), xml_names,
+                                    [self._optimizations] * len(files),
+                                    [self._peephole_rules] * len(files)))
+        failed = False
+        for file, out_name, (error, stats) in zip(files, out_names, results):
+            self._add_stats(stats)
+            if error is not None:
+                print(file + ": " + error)
+                failed = True
+            elif manifest is not None:
+                manifest.update(file, out_name)
+        if failed:
+            sys.exit(1)
+
+    def _add_stats(self, stats):
+        """
+        adds the peephole rule hits of a class to the totals
+        :param stats: dict of rule name -> hits
+        """
+        for name, hits in stats.items():
+            self.peephole_stats[name] += hits
+
+    def _get_out_name(self, file):
+        """
+        :param file: a jack file we compile
+        :return: the path of the vm file we compile it into
+        """
+        out_name = str(os.path.basename(file).split('.')[0]) + ".vm"
+        return self._out_path + "/" + out_name
+
+    def _get_xml_name(self, file):
+        """
+        :param file: a jack file we compile
+        :return: the path of the xml file of its parse tree, or None if we
+        do not write xml files
+        """
+        if not self._xml:
+            return None
+        return self._get_out_name(file)[:-len(".vm")] + ".xml"
+
+    def _build_version(self):
+        """
+        :return: the version of the compiler and of the options that change
+        its outputs, a build with other options is not reused
+        """
+        version = COMPILER_VERSION + " -O " + ",".join(self._optimizations)
+        if "peephole" in self._optimizations:
+            version += " --peephole-rules " + ",".join(self._peephole_rules)
+        if self._xml:
+            return version + " --xml"
+        return version
 
     def _get_paths(self):
         """
@@ -56,9 +217,39 @@ class JackAnalyzer:
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != NUM_OF_ARG:
-        print(ARG_ERROR)
-        sys.exit()
-    current_input = sys.argv[1]
-    analyzer = JackAnalyzer(current_input)
-    analyzer.create_out()
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("path", help="a jack file or a directory of jack "
+                                         "files")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="do not use the token cache")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1,
+                            help="compile the classes in N processes (0 for "
+                                 "one per cpu)")
+    arg_parser.add_argument("-i", "--incremental", action="store_true",
+                            help="compile only the classes that changed "
+                                 "since the last incremental build")
+    arg_parser.add_argument("--xml", action="store_true",
+                            help="also write the parse tree of every class "
+                                 "into an xml file (as in project 10)")
+    arg_parser.add_argument("-O", "--optimize", metavar="NAMES",
+                            default=",".join(DEFAULT_OPTIMIZATIONS),
+                            help="a comma separated list of the "
+                                 "optimizations to make, 'all' or 'none' "
+                                 "(default: %(default)s)")
+    arg_parser.add_argument("--peephole-rules", metavar="NAMES",
+                            default="all",
+                            help="the rules of the peephole optimization, a "
+                                 "comma separated list of " +
+                                 ", ".join(PEEPHOLE_RULE_NAMES) +
+                                 ", 'all' or 'none' (default: all)")
+    arg_parser.add_argument("--peephole-stats", action="store_true",
+                            help="print how many times every peephole rule "
+                                 "and the jump threading matched")
+    args = arg_parser.parse_args()
+    analyzer = JackAnalyzer(args.path, not args.no_cache, args.xml,
+                            parse_optimizations(args.optimize),
+                            parse_peephole_rules(args.peephole_rules))
+    analyzer.create_out(args.jobs or os.cpu_count(), args.incremental)
+    if args.peephole_stats:
+        for rule_name, rule_hits in analyzer.peephole_stats.items():
+            print(rule_name + ": " + str(rule_hits))
@@ -1,4 +1,10 @@
+import mmap
+import os
 import re
+import struct
+import sys
+from array import array
+from collections import deque
 
 IS_EMPTY_LINE = ""
 
@@ -23,19 +29,326 @@ COMMENT_PATTERN = r'//.*?$|/\*.*?\*/|\'(?:\\.|[^\\\'])*\'|"(?:\\.|[^\\"])*"'
 IDENTIFIER_PATTERN = "(\\s*(((_)[\\w])|[a-zA-Z])[\\w_]*\\s*)"
 STRING_PATTERN = "\"[^\"]*\""
 
+# a single pattern that skips white space and comments and classifies every
+# other token of the file in one scan - the name of the group that matched is
+# the type of the token
+LEXER_PATTERN = re.compile(r"""
+    (?P<SKIP>\s+|//[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<STRING_CONST>"[^"\n]*")
+    |(?P<INT_CONST>\d+)
+    |(?P<WORD>[a-zA-Z_]\w*)
+    |(?P<SYMBOL>[""" + SYMBOLS_STR + r"""])
+    |(?P<ERROR>.)
+    """, re.DOTALL | re.VERBOSE)
+ILLEGAL_TOKEN_ERROR = "illegal token: "
+# an integer constant is always a term, so one out of range gives the error
+# the engine gives in line mode, where it is not classified as a token
+INT_CONST_ERROR = "invalid input in compile term"
+
+# the same pattern over bytes, used to tokenize memory mapped files without
+# decoding them - only identifiers and string constants are decoded
+LEXER_BYTES_PATTERN = re.compile(LEXER_PATTERN.pattern.encode(),
+                                 re.DOTALL | re.VERBOSE)
+KEY_WORDS_BYTES = {word.encode(): word for word in KEY_WORDS}
+SYMBOLS_BYTES = {symbol.encode(): symbol for symbol in SYMBOLS}
+# files of at least this many bytes are memory mapped in whole file mode
+MMAP_THRESHOLD = 1 << 20
+
+# the type codes kept in a TokenStream, TYPE_NAMES[code] is the type string
+# returned by JackTokenizer.token_type()
+KEYWORD_T = 0
+SYMBOL_T = 1
+INT_CONST_T = 2
+STRING_CONST_T = 3
+IDENTIFIER_T = 4
+TYPE_NAMES = ("KEYWORD", "SYMBOL", "INT_CONST", "STRING_CONST", "IDENTIFIER")
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# the header of a serialized TokenStream: magic, number of tokens, number of
+# interned strings and the size of the string table in bytes
+STREAM_HEADER = struct.Struct("<4sIII")
+STREAM_MAGIC = b"JTS1"
+
+
+def is_int_const(token):
+    """
+    :param token: a string of digits
+    :return: true if the token is an integer constant in the range of jack
+    """
+    return token.isdigit() and int(token) <= JACK_INT_RANGE
+
+
+class TokenStream:
+    """
+    a compact stream of typed tokens - the tokens are kept in parallel arrays
+    of type codes, indices into a table of interned token strings and
+    line/column numbers, so no object is allocated per token. a cursor
+    points at the current token
+    """
+
+    def __init__(self):
+        """
+        creates a new empty token stream
+        """
+        self.types = array('b')
+        self.values = array('i')
+        self.lines = array('i')
+        self.cols = array('i')
+        self.table = []
+        self._table_index = dict()
+        self.pos = -1
+
+    def append(self, type_code, token, line, col):
+        """
+        adds a token to the end of the stream
+        :param type_code: one of the type codes (KEYWORD_T, SYMBOL_T ...)
+        :param token: the token string
+        :param line: the line of the token in the input (counted from 1)
+        :param col: the column of the token in its line (counted from 0)
+        """
+        value = self._table_index.get(token)
+        if value is None:
+            value = len(self.table)
+            self._table_index[token] = value
+            self.table.append(token)
+        self.types.append(type_code)
+        self.values.append(value)
+        self.lines.append(line)
+        self.cols.append(col)
+
+    def __len__(self):
+        return len(self.types)
+
+    def has_more(self):
+        """
+        :return: true iff there is a token after the current one
+        """
+        return self.pos + 1 < len(self.types)
+
+    def advance(self):
+        """
+        moves the cursor to the next token
+        """
+        self.pos += 1
+
+    def peek(self, k=1):
+        """
+        :param k: how many tokens ahead of the current token to look
+        :return: the token string k tokens after the current one or None if
+        the stream ends before it
+        """
+        i = self.pos + k
+        if 0 <= i < len(self.types):
+            return self.table[self.values[i]]
+
+    def peek_type(self, k=1):
+        """
+        :param k: how many tokens ahead of the current token to look
+        :return: the type code of the token k tokens after the current one
+        or None if the stream ends before it
+        """
+        i = self.pos + k
+        if 0 <= i < len(self.types):
+            return self.types[i]
+
+    def mark(self):
+        """
+        :return: a mark of the current position which can be given to rewind
+        """
+        return self.pos
+
+    def rewind(self, mark):
+        """
+        moves the cursor back (or forward) to a position returned by mark
+        :param mark: the position to move to
+        """
+        self.pos = mark
+
+    def location(self):
+        """
+        :return: (line, column) of the current token
+        """
+        return self.lines[self.pos], self.cols[self.pos]
+
+    def to_bytes(self):
+        """
+        serializes the stream: a STREAM_HEADER, the string table (the
+        strings are joined by new lines which no token can contain) and
+        then the raw parallel arrays
+        :return: the bytes of the stream
+        """
+        table = "\n".join(self.table).encode()
+        header = STREAM_HEADER.pack(STREAM_MAGIC, len(self.types),
+                                    len(self.table), len(table))
+        return b"".join((header, table, self.types.tobytes(),
+                         self.values.tobytes(), self.lines.tobytes(),
+                         self.cols.tobytes()))
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        rebuilds a stream serialized by to_bytes
+        :param data: the bytes of the stream
+        :return: the TokenStream or None if the data is not a valid stream
+        """
+        if len(data) < STREAM_HEADER.size:
+            return None
+        magic, n_tokens, n_table, table_size = STREAM_HEADER.unpack_from(data)
+        stream = TokenStream()
+        offset = STREAM_HEADER.size
+        if magic != STREAM_MAGIC:
+            return None
+        if n_table:
+            try:
+                stream.table = data[offset:offset + table_size].decode() \
+                    .split("\n")
+            except UnicodeDecodeError:
+                return None
+        if len(stream.table) != n_table:
+            return None
+        offset += table_size
+        for column in (stream.types, stream.values, stream.lines,
+                       stream.cols):
+            size = n_tokens * column.itemsize
+            if len(data) < offset + size:
+                return None
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        # every token must be a string of the table and of a known type
+        if n_tokens and (min(stream.types) < 0 or
+                         max(stream.types) >= len(TYPE_NAMES) or
+                         min(stream.values) < 0 or
+                         max(stream.values) >= n_table):
+            return None
+        stream._table_index = {token: i for i, token in
+                               enumerate(stream.table)}
+        return stream
+
 
 class JackTokenizer:
 
-    def __init__(self, path):
+    def __init__(self, path, whole_file=False, mapped=None, cache=None):
         """
         A constructor for the JackTokenizer
         :param path: the path of the current input file we want to compile
+        :param whole_file: if true the whole file is lexed at once with
+        LEXER_PATTERN, otherwise the file is read line by line
+        :param mapped: in whole file mode - if true the file is memory mapped
+        and tokenized as bytes, if None it is mapped only when it has at
+        least MMAP_THRESHOLD bytes
+        :param cache: in whole file mode - a TokenCache to take the tokens
+        of an unchanged file from (and to save new tokens to) or None
         """
-        self._file = open(path)
         self.curr_token = None
+        self.curr_type = None
         self._within_comment = False
+        self.stream = None
+        if whole_file:
+            key = None
+            if cache is not None:
+                key = cache.key(path)
+                self.stream = cache.load(key)
+                if self.stream is not None:
+                    return
+            if mapped is None:
+                mapped = os.path.getsize(path) >= MMAP_THRESHOLD
+            if mapped:
+                self.stream = JackTokenizer.lex_mapped(path)
+            else:
+                with open(path) as in_file:
+                    self.stream = JackTokenizer.lex(in_file.read())
+            if key is not None:
+                cache.store(key, self.stream)
+            return
+        self._file = open(path)
         self._token_buff = self._get_tokens()
 
+    @staticmethod
+    def lex(text):
+        """
+        splits the whole text of a jack file into typed tokens in a single
+        scan, comments and white space are dropped on the way
+        :param text: the content of a jack file
+        :return: a TokenStream of the tokens in the text
+        """
+        tokens = TokenStream()
+        line = 1
+        line_start = 0
+        for match in LEXER_PATTERN.finditer(text):
+            kind = match.lastgroup
+            token = match.group()
+            if kind == "SKIP":
+                new_lines = token.count("\n")
+                if new_lines:
+                    line += new_lines
+                    line_start = match.start() + token.rindex("\n") + 1
+                continue
+            if kind == "WORD":
+                kind = "KEYWORD" if token in KEY_WORDS else "IDENTIFIER"
+            elif kind == "ERROR":
+                print(ILLEGAL_TOKEN_ERROR + token)
+                sys.exit()
+            elif kind == "INT_CONST" and not is_int_const(token):
+                print(INT_CONST_ERROR)
+                sys.exit()
+            tokens.append(TYPE_CODES[kind], token, line,
+                          match.start() - line_start)
+        return tokens
+
+    @staticmethod
+    def lex_mapped(path):
+        """
+        memory maps a jack file and tokenizes its bytes in a single scan like
+        lex(), so neither the decoded source nor its lines are ever held in
+        memory - only the token stream is. columns are counted in bytes
+        :param path: the path of the jack file
+        :return: a TokenStream of the tokens in the file
+        """
+        tokens = TokenStream()
+        with open(path, 'rb') as in_file:
+            if os.fstat(in_file.fileno()).st_size == 0:
+                return tokens
+            with mmap.mmap(in_file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as source:
+                line = 1
+                line_start = 0
+                for match in LEXER_BYTES_PATTERN.finditer(source):
+                    kind = match.lastgroup
+                    token = match.group()
+                    if kind == "SKIP":
+                        new_lines = token.count(b"\n")
+                        if new_lines:
+                            line += new_lines
+                            line_start = match.start() + \
+                                token.rindex(b"\n") + 1
+                        continue
+                    if kind == "WORD":
+                        word = KEY_WORDS_BYTES.get(token)
+                        if word is None:
+                            tokens.append(IDENTIFIER_T, token.decode(), line,
+                                          match.start() - line_start)
+                            continue
+                        tokens.append(KEYWORD_T, word, line,
+                                      match.start() - line_start)
+                    elif kind == "SYMBOL":
+                        tokens.append(SYMBOL_T, SYMBOLS_BYTES[token], line,
+                                      match.start() - line_start)
+                    elif kind == "INT_CONST":
+                        token = token.decode('ascii')
+                        if not is_int_const(token):
+                            print(INT_CONST_ERROR)
+                            sys.exit()
+                        tokens.append(INT_CONST_T, token, line,
+                                      match.start() - line_start)
+                    elif kind == "STRING_CONST":
+                        tokens.append(STRING_CONST_T, token.decode(), line,
+                                      match.start() - line_start)
+                    else:
+                        print(ILLEGAL_TOKEN_ERROR +
+                              token.decode(errors='replace'))
+                        sys.exit()
+        return tokens
+
     def _get_tokens(self):
         """
         reads the file line by line - for each line we create a list of tokens
@@ -48,7 +361,7 @@ class JackTokenizer:
         curr_line = self._handle_comments(curr_line).strip()
         curr_line = JackTokenizer.comment_remover(curr_line)
         tokens = re.split(TOKEN_REGEX, curr_line)
-        return list(filter(None, tokens))
+        return deque(filter(None, tokens))
 
     def _handle_comments(self, curr_line):
         """
@@ -101,9 +414,39 @@ class JackTokenizer:
         gets the next token (the one after the current token)
         :return: the next token (which is at the beginning of our token buff)
         """
+        if self.stream is not None:
+            return self.stream.peek()
         if self._token_buff:
             return self._token_buff[0]
 
+    def peek(self, k=1):
+        """
+        looks k tokens ahead of the current token, only in whole file mode
+        since the line mode only knows the tokens of the current line
+        :param k: how many tokens ahead to look
+        :return: the token k tokens after the current token
+        """
+        return self.stream.peek(k)
+
+    def mark(self):
+        """
+        :return: a mark of the current token, only in whole file mode
+        """
+        return self.stream.mark()
+
+    def rewind(self, mark):
+        """
+        goes back to the token of the given mark, only in whole file mode
+        :param mark: a mark returned by mark()
+        """
+        stream = self.stream
+        stream.rewind(mark)
+        if mark < 0:
+            self.curr_type = self.curr_token = None
+            return
+        self.curr_type = TYPE_NAMES[stream.types[mark]]
+        self.curr_token = stream.table[stream.values[mark]]
+
     def has_more_tokens(self):
         """
         checks if there are any more tokens left in the file we are reading
@@ -111,6 +454,8 @@ class JackTokenizer:
         :return: false iff the token buff is empty meaning there are no more
         tokens
         """
+        if self.stream is not None:
+            return self.stream.has_more()
         if self._token_buff:
             return len(self._token_buff) > 0
 
@@ -120,10 +465,18 @@ class JackTokenizer:
         if the token buffer is now empty we read another line from the file
         and fill the token buff with tokens from the new line
         """
+        stream = self.stream
+        if stream is not None:
+            if stream.has_more():
+                stream.advance()
+                self.curr_type = TYPE_NAMES[stream.types[stream.pos]]
+                self.curr_token = stream.table[stream.values[stream.pos]]
+            return
         if not self.has_more_tokens():
             self._file.close()
             return
-        self.curr_token = self._token_buff.pop(0)
+        self.curr_token = self._token_buff.popleft()
+        self.curr_type = self._classify()
         if not self.has_more_tokens():
             self._token_buff = self._get_tokens()
 
@@ -134,6 +487,14 @@ class JackTokenizer:
         """
         if not self.curr_token:
             return "No current token"
+        return self.curr_type
+
+    def _classify(self):
+        """
+        classifies the current token, it is done once when we advance to the
+        token
+        :return: the type of the current token
+        """
         if self._is_keyword():
             return "KEYWORD"
         elif self._is_symbol():
@@ -158,8 +519,7 @@ class JackTokenizer:
         return self.curr_token in KEY_WORDS
 
     def _is_int(self):
-        token = self.curr_token
-        return token.isdigit() and int(token) in range(JACK_INT_RANGE)
+        return is_int_const(self.curr_token)
 
     def _is_str(self):
         """
@@ -178,35 +538,35 @@ class JackTokenizer:
         """
         :return: the current token string if the current token is a key_word
         """
-        if self._is_keyword():
+        if self.curr_type == "KEYWORD":
             return self.curr_token
 
     def symbol(self):
         """
         :return: the current token string if the current token is a symbol
         """
-        if self._is_symbol():
+        if self.curr_type == "SYMBOL":
             return self.curr_token
 
     def identifier(self):
         """
         :return: the current token string if the current token is an identifier
         """
-        if self._is_identifier():
+        if self.curr_type == "IDENTIFIER":
             return self.curr_token
 
     def int_val(self):
         """
         :return: the current token int if the current token is an int
         """
-        if self._is_int():
+        if self.curr_type == "INT_CONST":
             return int(self.curr_token)
 
     def string_val(self):
         """
         :return: the current token string if the current token is a string
         """
-        if self._is_str():
+        if self.curr_type == "STRING_CONST":
             return self.curr_token.replace("\"", "")
 
     def get_token_str(self):
@@ -215,7 +575,7 @@ class JackTokenizer:
         type is
         :return: a string of the current token
         """
-        curr_type = self.token_type()
+        curr_type = self.curr_type
         if curr_type == "KEYWORD":
             return self.key_word()
         if curr_type == "SYMBOL":
@@ -0,0 +1,584 @@
+import sys
+from JackAST import *
+
+UNKNOWN_OPTIMIZATION_ERROR = "unknown optimization"
+
+# the optimizations in the order they run, the passes over the tree run
+# between the parsing and the code generation, the others are options of
+# the code generator
+OPTIMIZATIONS = ["fold", "constprop", "licm", "strength", "strpool",
+                 "strinit", "layout", "cse", "offsets", "peephole", "threading",
+                 "locals"]
+
+DEFAULT_OPTIMIZATIONS = ["fold", "constprop", "licm", "strength", "layout",
+                         "cse", "offsets", "peephole", "threading", "locals"]
+
+WORD = 1 << 16
+
+MAX_INT = (1 << 15) - 1
+
+KEYWORD_VALUES = {"true": -1, "false": 0, "null": 0}
+
+# the operators that are written as calls of the os
+MATH_OPS = {'*': "Math.multiply", '/': "Math.divide"}
+
+# the operators of the expressions licm moves out of loops - no calls that
+# may have side effects (Math.multiply has none and always returns, a
+# division may fail) and no comparisons, the layout wants to see those
+HOISTED_BINARY_OPS = "+-*&|"
+
+HOISTED_UNARY_OPS = "-~"
+
+# the locals licm adds, a jack name can not have a '$' so they are not taken
+LICM_PREFIX = "$licm"
+
+
+def parse_optimizations(names):
+    """
+    :param names: a comma separated list of optimizations, 'all' or 'none'
+    :return: the list of the optimizations in the order they run. prints
+    unknown optimization error if one of the names is not known and exits
+    the program
+    """
+    if names == "all":
+        return list(OPTIMIZATIONS)
+    if names == "none":
+        return []
+    chosen = set(name.strip() for name in names.split(",") if name.strip())
+    for name in chosen:
+        if name not in OPTIMIZATIONS:
+            print(UNKNOWN_OPTIMIZATION_ERROR + ": " + name)
+            sys.exit()
+    return [name for name in OPTIMIZATIONS if name in chosen]
+
+
+def get_passes(optimizations):
+    """
+    :param optimizations: the names of the chosen optimizations
+    :return: the passes over the tree of these optimizations, in order
+    """
+    return [PASSES[name] for name in optimizations if name in PASSES]
+
+
+def to_int16(value):
+    """
+    :param value: int
+    :return: the value wrapped to a 16-bit two's complement int
+    """
+    value %= WORD
+    return value - WORD if value > MAX_INT else value
+
+
+def map_statements(statements, func, deep=True):
+    """
+    replaces every expression in the statements (and the statements nested
+    in them) by func of it, the sub expressions are replaced first
+    :param statements: list of statements
+    :param func: gets an expression node and returns a node to put instead
+    :param deep: false to replace only the whole expressions of the
+    statements, func is not called for their sub expressions
+    """
+    def replace(expr):
+        return map_expression(expr, func) if deep else func(expr)
+
+    for statement in statements:
+        if isinstance(statement, Let):
+            if statement.index is not None:
+                statement.index = replace(statement.index)
+            statement.value = replace(statement.value)
+        elif isinstance(statement, If):
+            statement.cond = replace(statement.cond)
+            map_statements(statement.then_statements, func, deep)
+            if statement.else_statements is not None:
+                map_statements(statement.else_statements, func, deep)
+        elif isinstance(statement, While):
+            statement.cond = replace(statement.cond)
+            map_statements(statement.statements, func, deep)
+        elif isinstance(statement, Do):
+            statement.call = replace(statement.call)
+        elif statement.value is not None:
+            statement.value = replace(statement.value)
+
+
+def map_expression(expr, func):
+    """
+    :param expr: an expression node
+    :param func: gets an expression node and returns a node to put instead
+    :return: func of the expression after its sub expressions were replaced
+    """
+    if isinstance(expr, BinaryOp):
+        expr.left = map_expression(expr.left, func)
+        expr.right = map_expression(expr.right, func)
+    elif isinstance(expr, UnaryOp):
+        expr.operand = map_expression(expr.operand, func)
+    elif isinstance(expr, Group):
+        expr.expr = map_expression(expr.expr, func)
+    elif isinstance(expr, ArrayRef):
+        expr.index = map_expression(expr.index, func)
+    elif isinstance(expr, Call):
+        expr.args = [map_expression(arg, func) for arg in expr.args]
+    return func(expr)
+
+
+def calls_subroutine(expr):
+    """
+    :param expr: an expression node (not the ones in it)
+    :return: true if writing the node calls a subroutine - a call, a string
+    constant (String.new and appendChar) or * and / (Math.multiply and
+    Math.divide), any of them may change a static or a field
+    """
+    return isinstance(expr, (Call, StringConst)) or \
+        isinstance(expr, BinaryOp) and expr.op in MATH_OPS
+
+
+def constant_value(expr):
+    """
+    :param expr: an expression node
+    :return: the 16-bit value of the expression if it is a constant (an
+    int, true, false or null), None otherwise
+    """
+    if isinstance(expr, IntConst):
+        return to_int16(expr.value)
+    if isinstance(expr, KeywordConst):
+        return KEYWORD_VALUES.get(expr.word)
+    return None
+
+
+def fold_constants(class_node):
+    """
+    evaluates at compile time the expressions whose operands are all
+    constants, with the 16-bit two's complement arithmetic of the hack
+    :param class_node: ClassNode
+    :return: the class with the folded expressions
+    """
+    for subroutine in class_node.subroutines:
+        map_statements(subroutine.statements, _fold)
+    return class_node
+
+
+def _fold(expr):
+    """
+    :param expr: an expression node whose sub expressions are folded
+    :return: an IntConst of its value if it is constant, the node otherwise
+    """
+    if isinstance(expr, Group):
+        value = constant_value(expr.expr)
+    elif isinstance(expr, UnaryOp):
+        value = constant_value(expr.operand)
+        if value is not None:
+            value = -value if expr.op == '-' else ~value
+    elif isinstance(expr, BinaryOp):
+        value = _fold_binary(expr.op, constant_value(expr.left),
+                             constant_value(expr.right))
+    else:
+        return expr
+    if value is None:
+        return expr
+    return IntConst(to_int16(value))
+
+
+def _fold_binary(op, left, right):
+    """
+    :param op: the operator
+    :param left: the value of the left operand or None
+    :param right: the value of the right operand or None
+    :return: the value of left op right, or None if it is not known at
+    compile time
+    """
+    if left is None or right is None:
+        return None
+    if op == '+':
+        return left + right
+    if op == '-':
+        return left - right
+    if op == '*':
+        return left * right
+    if op == '/':
+        # Math.divide truncates towards zero, we fold only where it is
+        # right (it fails on 0 and doubles the divisor past the dividend)
+        if right in (0, -MAX_INT - 1) or not -WORD // 4 < left < WORD // 4:
+            return None
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    if op == '&':
+        return left & right
+    if op == '|':
+        return left | right
+    if op == '<':
+        return -(left < right)
+    if op == '>':
+        return -(left > right)
+    return -(left == right)
+
+
+def expression_key(expr):
+    """
+    :param expr: an expression node
+    :return: a tuple that is the same for expressions of the same structure
+    """
+    if isinstance(expr, BinaryOp):
+        return "op", expr.op, expression_key(expr.left), \
+            expression_key(expr.right)
+    if isinstance(expr, UnaryOp):
+        return "unary", expr.op, expression_key(expr.operand)
+    if isinstance(expr, Group):
+        return expression_key(expr.expr)
+    if isinstance(expr, ArrayRef):
+        return "array", expr.name, expression_key(expr.index)
+    if isinstance(expr, Call):
+        return ("call", expr.receiver, expr.name) + \
+            tuple(expression_key(arg) for arg in expr.args)
+    if isinstance(expr, IntConst):
+        return "int", expr.value
+    if isinstance(expr, StringConst):
+        return "string", expr.value
+    if isinstance(expr, KeywordConst):
+        return "keyword", expr.word
+    return "var", expr.name
+
+
+def assigned_names(statements):
+    """
+    :param statements: list of statements
+    :return: the names of the variables the statements (and the statements
+    nested in them) assign, not counting the cells of arrays
+    """
+    names = set()
+    for statement in statements:
+        if isinstance(statement, Let):
+            if statement.index is None:
+                names.add(statement.name)
+        elif isinstance(statement, If):
+            names |= assigned_names(statement.then_statements)
+            if statement.else_statements is not None:
+                names |= assigned_names(statement.else_statements)
+        elif isinstance(statement, While):
+            names |= assigned_names(statement.statements)
+    return names
+
+
+def writes_memory(statements):
+    """
+    :param statements: list of statements
+    :return: true if the statements may change a static or a field without
+    naming it - they call a subroutine (see calls_subroutine) or write to an
+    array
+    """
+    found = []
+
+    def find(expr):
+        if calls_subroutine(expr):
+            found.append(expr)
+        return expr
+
+    def find_stores(cur_statements):
+        for statement in cur_statements:
+            if isinstance(statement, Let) and statement.index is not None:
+                found.append(statement)
+            elif isinstance(statement, If):
+                find_stores(statement.then_statements)
+                find_stores(statement.else_statements or [])
+            elif isinstance(statement, While):
+                find_stores(statement.statements)
+
+    find_stores(statements)
+    map_statements(statements, find)
+    return bool(found)
+
+
+def local_names(subroutine):
+    """
+    :param subroutine: Subroutine
+    :return: the names of the parameters and the locals of the subroutine
+    """
+    names = set(name for param_type, name in subroutine.params)
+    for var_dec in subroutine.var_decs:
+        names.update(var_dec.names)
+    return names
+
+
+def shared_names(class_node, subroutine):
+    """
+    :param class_node: ClassNode
+    :param subroutine: one of its subroutines
+    :return: the names of the statics and the fields the subroutine sees
+    (those a local or a parameter does not hide), a call may change them
+    """
+    names = set()
+    for var_dec in class_node.class_vars:
+        names.update(var_dec.names)
+    return names - local_names(subroutine)
+
+
+def hoist_invariants(class_node):
+    """
+    loop invariant code motion - an expression in a while whose variables
+    the loop does not assign is computed once into a new local before the
+    loop. only expressions without side effects that can not fail are
+    moved, so it does not matter that they are computed even if the loop
+    does not run. a static or a field counts as assigned in a loop that
+    calls a subroutine or writes to an array
+    :param class_node: ClassNode
+    :return: the class with the hoisted expressions
+    """
+    for subroutine in class_node.subroutines:
+        new_locals = []
+        _hoist_statements(subroutine.statements,
+                          shared_names(class_node, subroutine), new_locals)
+        if new_locals:
+            subroutine.var_decs.append(VarDec("int", new_locals))
+    return class_node
+
+
+def _hoist_statements(statements, shared_names, new_locals):
+    """
+    moves the invariants of every while in the statements out of it, the
+    outer loops first
+    :param statements: list of statements, changed in place
+    :param shared_names: the names of the statics and fields that are seen
+    :param new_locals: the names of the locals added so far, the new ones
+    are appended
+    """
+    i = 0
+    while i < len(statements):
+        statement = statements[i]
+        if isinstance(statement, If):
+            _hoist_statements(statement.then_statements, shared_names,
+                              new_locals)
+            if statement.else_statements is not None:
+                _hoist_statements(statement.else_statements, shared_names,
+                                  new_locals)
+        elif isinstance(statement, While):
+            hoisted = _hoist_loop(statement, shared_names, new_locals)
+            statements[i:i] = hoisted
+            i += len(hoisted)
+            _hoist_statements(statement.statements, shared_names, new_locals)
+        i += 1
+
+
+def _hoist_loop(loop, shared_names, new_locals):
+    """
+    replaces the invariants of a loop by new locals
+    :param loop: While
+    :param shared_names: the names of the statics and fields that are seen
+    :param new_locals: the names of the locals added so far
+    :return: the lets that compute the new locals, to put before the loop
+    """
+    variant = assigned_names(loop.statements)
+    if writes_memory([loop]):
+        variant |= shared_names
+    hoisted = []
+    # expression key -> the local that holds it
+    names = {}
+
+    def is_invariant(expr):
+        if isinstance(expr, Group):
+            return is_invariant(expr.expr)
+        if isinstance(expr, (IntConst, KeywordConst)):
+            return True
+        if isinstance(expr, VarRef):
+            return expr.name not in variant
+        if isinstance(expr, UnaryOp):
+            return expr.op in HOISTED_UNARY_OPS and is_invariant(expr.operand)
+        if isinstance(expr, BinaryOp):
+            return expr.op in HOISTED_BINARY_OPS and \
+                is_invariant(expr.left) and is_invariant(expr.right)
+        return False
+
+    def hoist(expr):
+        inner = expr
+        while isinstance(inner, Group):
+            inner = inner.expr
+        if isinstance(inner, (BinaryOp, UnaryOp)) and is_invariant(inner) \
+                and not _is_constant(inner):
+            key = expression_key(inner)
+            if key not in names:
+                names[key] = LICM_PREFIX + str(len(new_locals))
+                new_locals.append(names[key])
+                hoisted.append(Let(names[key], None, inner))
+            return VarRef(names[key])
+        if isinstance(expr, BinaryOp):
+            expr.left = hoist(expr.left)
+            expr.right = hoist(expr.right)
+        elif isinstance(expr, UnaryOp):
+            expr.operand = hoist(expr.operand)
+        elif isinstance(expr, Group):
+            expr.expr = hoist(expr.expr)
+        elif isinstance(expr, ArrayRef):
+            expr.index = hoist(expr.index)
+        elif isinstance(expr, Call):
+            expr.args = [hoist(arg) for arg in expr.args]
+        return expr
+
+    loop.cond = hoist(loop.cond)
+    map_statements(loop.statements, hoist, deep=False)
+    return hoisted
+
+
+def _is_constant(expr):
+    """
+    :param expr: an expression node
+    :return: true if the expression reads no variable (folding is the one
+    to handle it)
+    """
+    if isinstance(expr, Group):
+        return _is_constant(expr.expr)
+    if isinstance(expr, UnaryOp):
+        return _is_constant(expr.operand)
+    if isinstance(expr, BinaryOp):
+        return _is_constant(expr.left) and _is_constant(expr.right)
+    return isinstance(expr, (IntConst, KeywordConst))
+
+
+def propagate_constants(class_node):
+    """
+    constant and copy propagation - where a variable surely holds a
+    constant (or the value of a local or a parameter) on every path, its
+    uses are replaced by the constant (or the other variable) and the
+    expression is folded again. the locals start as 0. a call or a write to
+    an array may change the statics and the fields, and a loop keeps only
+    what it does not assign
+    :param class_node: ClassNode
+    :return: the class with the propagated constants
+    """
+    for subroutine in class_node.subroutines:
+        # name -> the int it holds, or the VarRef of the variable it copies
+        values = dict.fromkeys(
+            (name for var_dec in subroutine.var_decs
+             for name in var_dec.names), 0)
+        _propagate_statements(subroutine.statements, values,
+                              shared_names(class_node, subroutine))
+    return class_node
+
+
+def _propagate_statements(statements, values, shared):
+    """
+    propagates the known values through the statements
+    :param statements: list of statements, changed in place
+    :param values: the known values before them, changed to the known
+    values after them
+    :param shared: the names of the statics and fields
+    :return: the known values after the statements, None if they never end
+    (they return on every path)
+    """
+    for statement in statements:
+        if values is None:  # not reached, nothing is known there
+            values = {}
+        if isinstance(statement, Let):
+            if statement.index is not None:
+                statement.index = _propagate(statement.index, values, shared)
+            statement.value = _propagate(statement.value, values, shared)
+            if statement.index is not None:
+                _forget(values, shared)
+                continue
+            _forget(values, [statement.name])
+            value = constant_value(statement.value)
+            # a static is read as cheaply as a push constant of 0..32767 and
+            # more cheaply than a local, so it takes only those
+            if statement.name in shared:
+                if value is not None and 0 <= value <= MAX_INT:
+                    values[statement.name] = value
+            elif value is not None:
+                values[statement.name] = value
+            elif isinstance(statement.value, VarRef) and \
+                    statement.value.name not in shared and \
+                    statement.value.name != statement.name:
+                values[statement.name] = statement.value
+        elif isinstance(statement, If):
+            statement.cond = _propagate(statement.cond, values, shared)
+            then_values = _propagate_statements(statement.then_statements,
+                                                dict(values), shared)
+            else_values = _propagate_statements(
+                statement.else_statements or [], dict(values), shared)
+            values = _meet(then_values, else_values)
+        elif isinstance(statement, While):
+            # what holds at the test holds at every iteration
+            _forget(values, assigned_names(statement.statements))
+            if writes_memory([statement]):
+                _forget(values, shared)
+            statement.cond = _propagate(statement.cond, values, shared)
+            _propagate_statements(statement.statements, dict(values), shared)
+        elif isinstance(statement, Do):
+            statement.call = _propagate(statement.call, values, shared)
+        else:
+            if statement.value is not None:
+                statement.value = _propagate(statement.value, values, shared)
+            values = None
+    return values
+
+
+def _propagate(expr, values, shared):
+    """
+    :param expr: an expression node
+    :param values: the known values, the statics and fields are forgotten
+    after a call (see calls_subroutine)
+    :param shared: the names of the statics and fields
+    :return: the expression with the known variables replaced, folded
+    """
+    def replace(sub_expr):
+        if isinstance(sub_expr, VarRef) and sub_expr.name in values:
+            value = values[sub_expr.name]
+            if isinstance(value, VarRef):
+                return VarRef(value.name)
+            return IntConst(value)
+        if isinstance(sub_expr, BinaryOp):
+            sub_expr.left = replace(sub_expr.left)
+            sub_expr.right = replace(sub_expr.right)
+        elif isinstance(sub_expr, UnaryOp):
+            sub_expr.operand = replace(sub_expr.operand)
+        elif isinstance(sub_expr, Group):
+            sub_expr.expr = replace(sub_expr.expr)
+        elif isinstance(sub_expr, ArrayRef):
+            sub_expr.index = replace(sub_expr.index)
+        elif isinstance(sub_expr, Call):
+            # in the order they are computed, the call comes after its
+            # arguments
+            sub_expr.args = [replace(arg) for arg in sub_expr.args]
+        if calls_subroutine(sub_expr):
+            _forget(values, shared)
+        return sub_expr
+
+    return map_expression(replace(expr), _fold)
+
+
+def _forget(values, names):
+    """
+    removes the known values of the variables, and of the variables that
+    copy them
+    :param values: the known values
+    :param names: the names of the variables
+    """
+    names = set(names)
+    for name in list(values):
+        value = values[name]
+        if name in names or isinstance(value, VarRef) and \
+                value.name in names:
+            del values[name]
+
+
+def _meet(first, second):
+    """
+    :param first: the known values after a path, None if it never ends
+    :param second: the known values after another path
+    :return: the known values where the paths meet
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return dict((name, value) for name, value in first.items()
+                if _same_value(value, second.get(name)))
+
+
+def _same_value(first, second):
+    """
+    :return: true if two known values (ints or VarRefs) are the same
+    """
+    if isinstance(first, VarRef) or isinstance(second, VarRef):
+        return isinstance(first, VarRef) and isinstance(second, VarRef) \
+            and first.name == second.name
+    return second is not None and first == second
+
+
+PASSES = {"fold": fold_constants, "constprop": propagate_constants,
+          "licm": hoist_invariants}
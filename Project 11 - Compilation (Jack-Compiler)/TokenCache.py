@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+from JackTokenizer import TokenStream
+
+CACHE_DIR = ".jackcache"
+
+CACHE_SUFFIX = ".tok"
+
+READ_CHUNK = 1 << 16
+
+
+class TokenCache:
+    """
+    a persistent cache of token streams on disk - every stream is saved in
+    its own file named by a hash of the source file content and the
+    compiler version, so an unchanged class is never tokenized twice and a
+    new compiler version never reads the streams of an older one
+    """
+
+    def __init__(self, directory, version):
+        """
+        creates a cache in the given directory
+        :param directory: the directory we keep the cache directory in
+        :param version: the version of the compiler, part of every key
+        """
+        self._dir = os.path.join(directory, CACHE_DIR)
+        self._version = version.encode()
+
+    def key(self, path):
+        """
+        hashes a source file together with the compiler version
+        :param path: the path of the source file
+        :return: the key of the file in the cache (a hex string)
+        """
+        digest = hashlib.sha1(self._version)
+        with open(path, 'rb') as in_file:
+            for chunk in iter(lambda: in_file.read(READ_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        :param key: a key returned by key()
+        :return: the cached TokenStream of the key or None if there is none
+        (or it is not valid)
+        """
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                data = cache_file.read()
+        except OSError:
+            return None
+        try:
+            return TokenStream.from_bytes(data)
+        except ValueError:
+            # a corrupt cache file, the file is tokenized again
+            return None
+
+    def store(self, key, stream):
+        """
+        saves a token stream in the cache, the file is written under a
+        temporary name first so a reader never sees half of it
+        :param key: a key returned by key()
+        :param stream: the TokenStream of the file of the key
+        """
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            temp_path = self._path(key) + "." + str(os.getpid())
+            with open(temp_path, 'wb') as cache_file:
+                cache_file.write(stream.to_bytes())
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            # the cache is only an optimization - we can always tokenize again
+            pass
+
+    def keep_only(self, paths):
+        """
+        removes the streams of everything but the current content of the
+        given files - the old versions of changed files, the files that are
+        gone and the streams of other compiler versions, so the cache does
+        not grow as the files are edited
+        :param paths: all the source files of the build
+        """
+        keep = {self.key(path) + CACHE_SUFFIX for path in paths}
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(CACHE_SUFFIX) and name not in keep:
+                try:
+                    os.remove(os.path.join(self._dir, name))
+                except OSError:
+                    pass
+
+    def _path(self, key):
+        """
+        :param key: a key returned by key()
+        :return: the path of the cache file of the key
+        """
+        return os.path.join(self._dir, key + CACHE_SUFFIX)
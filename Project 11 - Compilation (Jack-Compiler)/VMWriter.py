@@ -1,11 +1,178 @@
+import sys
+
+UNKNOWN_RULE_ERROR = "unknown peephole rule"
+
+JUMPS = ["goto", "return"]
+
+COMPARISONS = ["eq", "gt", "lt"]
+
+
+def _push_pop(window):
+    """
+    push X, pop X - the value is stored where it was read from
+    """
+    push, pop = window
+    if push[0] == "push" and pop[0] == "pop" and push[1:] == pop[1:]:
+        return []
+
+
+def _double_not(window):
+    """
+    not, not (and neg, neg)
+    """
+    if window[0] == window[1] and window[0][0] in ("not", "neg"):
+        return []
+
+
+def _constant_branch(window):
+    """
+    push constant k, if-goto L - the jump is known (true is written as
+    push constant 0, not)
+    """
+    push, if_goto = window
+    if push[:2] == ("push", "constant") and if_goto[0] == "if-goto":
+        if push[2] == "0":
+            return []
+        return [("goto", if_goto[1])]
+
+
+def _true_branch(window):
+    """
+    push constant 0, not, if-goto L - always jumps
+    """
+    if window[0] == ("push", "constant", "0") and window[1] == ("not",) \
+            and window[2][0] == "if-goto":
+        return [("goto", window[2][1])]
+
+
+def _zero_operand(window):
+    """
+    push constant 0, add (or sub, or) - x op 0 is x
+    """
+    if window[0] == ("push", "constant", "0") and \
+            window[1][0] in ("add", "sub", "or"):
+        return []
+
+
+def _not_zero_branch(window):
+    """
+    push constant 0, eq, not, if-goto L - if-goto jumps on any value that
+    is not zero
+    """
+    if window[0] == ("push", "constant", "0") and window[1] == ("eq",) and \
+            window[2] == ("not",) and window[3][0] == "if-goto":
+        return [window[3]]
+
+
+def _inverted_branch(window):
+    """
+    eq (or gt, lt), not, if-goto A, goto B, label A - jump to B on the
+    condition itself. only after a comparison - if-goto jumps on anything
+    but 0 and not jumps on anything but -1, they agree only on booleans
+    """
+    if window[0][0] in COMPARISONS and window[1] == ("not",) and \
+            window[2][0] == "if-goto" and window[3][0] == "goto" and \
+            window[4] == ("label", window[2][1]):
+        return [window[0], ("if-goto", window[3][1]), window[4]]
+
+
+def _goto_next(window):
+    """
+    goto L, label L
+    """
+    if window[0][0] == "goto" and window[1] == ("label", window[0][1]):
+        return [window[1]]
+
+
+def _unreachable(window):
+    """
+    a command right after a goto or a return that is not a label can not be
+    reached
+    """
+    if window[0][0] in JUMPS and window[1][0] != "label":
+        return [window[0]]
+
+
+def _discard_before_return(window):
+    """
+    pop temp 0, push X, return - return drops the rest of the stack anyway,
+    so the value of the do need not be thrown away
+    """
+    if window[0] == ("pop", "temp", "0") and window[1][0] == "push" and \
+            window[1][1:] != ("temp", "0") and window[2] == ("return",):
+        return window[1:]
+
+
+# name, window size, rule. a rule gets the commands in the window and
+# returns the commands to put instead, or None if it does not match
+PEEPHOLE_RULES = [
+    ("push-pop", 2, _push_pop),
+    ("double-not", 2, _double_not),
+    ("true-branch", 3, _true_branch),
+    ("constant-branch", 2, _constant_branch),
+    ("zero-operand", 2, _zero_operand),
+    ("not-zero-branch", 4, _not_zero_branch),
+    ("inverted-branch", 5, _inverted_branch),
+    ("goto-next", 2, _goto_next),
+    ("unreachable", 2, _unreachable),
+    ("discard-before-return", 3, _discard_before_return),
+]
+
+PEEPHOLE_RULE_NAMES = [name for name, size, rule in PEEPHOLE_RULES]
+
+MAX_WINDOW = max(size for name, size, rule in PEEPHOLE_RULES)
+
+# what the jump threading counts: branches sent straight to their final
+# label, labels dropped for the label before them and labels nobody jumps to
+THREADING_STATS = ["threaded-jumps", "merged-labels", "removed-labels"]
+
+# how many local slots the packing of the locals saved
+PACKING_STATS = ["dropped-locals"]
+
+STAT_NAMES = PEEPHOLE_RULE_NAMES + THREADING_STATS + PACKING_STATS
+
+
+def parse_peephole_rules(names):
+    """
+    :param names: a comma separated list of peephole rules, 'all' or 'none'
+    :return: the list of the rules names. prints unknown peephole rule error
+    if one of the names is not known and exits the program
+    """
+    if names == "all":
+        return list(PEEPHOLE_RULE_NAMES)
+    if names == "none":
+        return []
+    chosen = set(name.strip() for name in names.split(",") if name.strip())
+    for name in chosen:
+        if name not in PEEPHOLE_RULE_NAMES:
+            print(UNKNOWN_RULE_ERROR + ": " + name)
+            sys.exit()
+    return [name for name in PEEPHOLE_RULE_NAMES if name in chosen]
+
+
 class VMWriter:
 
-    def __init__(self, out_file):
+    def __init__(self, out_file, peephole_rules=None, thread_jumps=False,
+                 pack_locals=False):
         """
-        Creates a new output.bm file and prepares it for writing
+        Creates a new output.bm file and prepares it for writing. the
+        commands of every subroutine are kept until it ends, and then the
+        peephole rules, the jump threading and the packing of the locals run
+        over them before they are written
         :param out_file: output file/stream
+        :param peephole_rules: the names of the peephole rules to run, None
+        or an empty list to write the commands as they are
+        :param thread_jumps: True to thread the jumps of every subroutine
+        :param pack_locals: True to share the local slots of the locals that
+        are never live together
         """
         self.out_file = open(out_file, 'w')
+        self._commands = []
+        self._rules = [(name, size, rule) for name, size, rule
+                       in PEEPHOLE_RULES if name in (peephole_rules or [])]
+        self._thread_jumps = thread_jumps
+        self._pack_locals = pack_locals
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
 
     def write_push(self, segment, index):
         """
@@ -14,7 +181,7 @@ class VMWriter:
         pointer,temp}
         :param index: int
         """
-        self.out_file.write("push " + segment + " " + str(index) + '\n')
+        self._commands.append(("push", segment, str(index)))
 
     def write_pop(self, segment, index):
         """
@@ -23,7 +190,7 @@ class VMWriter:
         pointer,temp}
         :param index: int
         """
-        self.out_file.write("pop " + segment + " " + str(index) + '\n')
+        self._commands.append(("pop", segment, str(index)))
 
     def write_call(self, name, n_args):
         """
@@ -32,34 +199,34 @@ class VMWriter:
         :param n_args: int
         :return:
         """
-        self.out_file.write("call " + name + " " + str(n_args) + '\n')
+        self._commands.append(("call", name, str(n_args)))
 
     def write_arithmetic(self, command):
         """
         Writes arithmetic-logical command
         :param command: from {add,sub,neg,not,eq,gt,lt,and,or}
         """
-        self.out_file.write(command + '\n')
+        self._commands.append((command,))
 
     def write_return(self):
         """
         Writes a VM return command
         """
-        self.out_file.write("return\n")
+        self._commands.append(("return",))
 
     def write_goto(self, label_name):
         """
         Writes a VM goto command
         :param label_name: string
         """
-        self.out_file.write("goto " + label_name + '\n')
+        self._commands.append(("goto", label_name))
 
     def write_if_goto(self, label_name):
         """
         Writes a VM if-goto command
         :param label_name: string
         """
-        self.out_file.write("if-goto " + label_name + '\n')
+        self._commands.append(("if-goto", label_name))
 
     def write_label(self, label_name):
         """
@@ -67,19 +234,194 @@ class VMWriter:
 
         :param label_name: string
         """
-        self.out_file.write("label " + label_name + '\n')
+        self._commands.append(("label", label_name))
 
     def write_function(self, name, n_locals):
         """
-        Writes a VM function command
+        Writes a VM function command, the commands of the subroutine before
+        it are written out
 
         :param name:  string
         :param n_locals: number of locals(int)
         """
-        self.out_file.write("function " + name + " " + str(n_locals) + '\n')
+        self._flush()
+        self._commands.append(("function", name, str(n_locals)))
 
     def close(self):
         """
-        closes the file
+        writes the last subroutine and closes the file
         """
+        self._flush()
         self.out_file.close()
+
+    def _flush(self):
+        """
+        runs the peephole rules and the jump threading over the commands of
+        the current subroutine until neither changes them, packs its locals
+        and writes them
+        """
+        while True:
+            if self._rules:
+                self._peephole()
+            if not (self._thread_jumps and self._thread()):
+                break
+        if self._pack_locals and self._commands and \
+                self._commands[0][0] == "function":
+            self._pack()
+        self.out_file.writelines(" ".join(command) + '\n'
+                                 for command in self._commands)
+        self._commands = []
+
+    def _peephole(self):
+        """
+        slides a window over the commands and replaces the first rule that
+        matches at every place, after a change we go back a window so the
+        new commands are matched again, until no rule matches
+        """
+        commands = self._commands
+        i = 0
+        while i < len(commands):
+            for name, size, rule in self._rules:
+                window = commands[i:i + size]
+                if len(window) < size:
+                    continue
+                replacement = rule(tuple(window))
+                if replacement is not None:
+                    commands[i:i + size] = replacement
+                    self.stats[name] += 1
+                    i = max(i - MAX_WINDOW + 1, 0)
+                    break
+            else:
+                i += 1
+
+    def _thread(self):
+        """
+        sends every goto and if-goto straight to the label it ends at - a
+        label followed by a goto is passed on to the label of that goto, and
+        of a run of adjacent labels only the first is kept. labels nobody
+        jumps to are removed (a label is local to its function)
+        :return: True if the commands were changed
+        """
+        commands = self._commands
+        # label -> the first label of its run, and the command after the run
+        first = {}
+        after = {}
+        run = []
+        for command in commands + [("end",)]:
+            if command[0] == "label":
+                run.append(command[1])
+                continue
+            for name in run:
+                first[name] = run[0]
+                after[name] = command
+            run = []
+
+        def final_label(label):
+            passed = set()
+            while after.get(label, ("end",))[0] == "goto" and \
+                    label not in passed:
+                passed.add(label)
+                label = after[label][1]
+            return first.get(label, label)
+
+        changed = False
+        used = set()
+        for i, command in enumerate(commands):
+            if command[0] in ("goto", "if-goto"):
+                target = final_label(command[1])
+                if target != command[1]:
+                    commands[i] = (command[0], target)
+                    self.stats["threaded-jumps"] += 1
+                    changed = True
+                used.add(target)
+        threaded = []
+        for command in commands:
+            if command[0] == "label" and command[1] not in used:
+                if first[command[1]] != command[1]:
+                    self.stats["merged-labels"] += 1
+                else:
+                    self.stats["removed-labels"] += 1
+                changed = True
+                continue
+            threaded.append(command)
+        self._commands = threaded
+        return changed
+
+    def _pack(self):
+        """
+        liveness analysis of the local slots of the subroutine - two locals
+        that are never live at the same place share a slot and a local that
+        is never used gets none, so the function has fewer locals to push.
+        the function starts with all the locals 0, so the locals that are
+        read before they are written on some path are all live together at
+        the start
+        """
+        commands = self._commands
+        count = len(commands)
+        labels = dict((command[1], i) for i, command in enumerate(commands)
+                      if command[0] == "label")
+        successors = []
+        for i, command in enumerate(commands):
+            if command[0] == "goto":
+                successors.append([labels[command[1]]])
+            elif command[0] == "if-goto":
+                successors.append([i + 1, labels[command[1]]])
+            elif command[0] == "return" or i + 1 == count:
+                successors.append([])
+            else:
+                successors.append([i + 1])
+
+        # the live slots after every command, as bits
+        live_out = [0] * count
+        live_in = [0] * count
+        changed = True
+        while changed:
+            changed = False
+            for i in range(count - 1, -1, -1):
+                live = 0
+                for successor in successors[i]:
+                    live |= live_in[successor]
+                live_out[i] = live
+                command = commands[i]
+                if command[1:2] == ("local",):
+                    if command[0] == "push":
+                        live |= 1 << int(command[2])
+                    else:
+                        live &= ~(1 << int(command[2]))
+                if live != live_in[i]:
+                    live_in[i] = live
+                    changed = True
+
+        # slot -> the bits of the slots it may not share with
+        conflicts = {}
+        for i, command in enumerate(commands):
+            if command[1:2] == ("local",):
+                slot = int(command[2])
+                conflicts.setdefault(slot, 0)
+                if command[0] == "pop":
+                    conflicts[slot] |= live_out[i] & ~(1 << slot)
+        for slot in conflicts:
+            if live_in[0] >> slot & 1:
+                conflicts[slot] |= live_in[0] & ~(1 << slot)
+        for slot in conflicts:
+            for other in conflicts:
+                if conflicts[slot] >> other & 1:
+                    conflicts[other] |= 1 << slot
+
+        # every slot takes the first new slot none of its conflicts took
+        new_slots = {}
+        for slot in sorted(conflicts):
+            taken = set(new_slots[other] for other in new_slots
+                        if conflicts[slot] >> other & 1)
+            new_slot = 0
+            while new_slot in taken:
+                new_slot += 1
+            new_slots[slot] = new_slot
+        for i, command in enumerate(commands):
+            if command[1:2] == ("local",):
+                commands[i] = (command[0], "local",
+                               str(new_slots[int(command[2])]))
+        function, name, n_locals = commands[0]
+        new_count = max(new_slots.values()) + 1 if new_slots else 0
+        commands[0] = (function, name, str(new_count))
+        self.stats["dropped-locals"] += int(n_locals) - new_count
@@ -0,0 +1,243 @@
+from JackAST import *
+
+TYPE_KEYWORDS = ['int', 'char', 'boolean', 'void']
+
+ESCAPED_SYMBOLS = {'<': "&lt;", '>': "&gt;", '&': "&amp;", '"': "&quot;"}
+
+
+class XMLWriter:
+    """
+    writes the abstract syntax tree of a class (see JackAST) as the xml
+    parse tree of project 10
+    """
+
+    def __init__(self, out_file):
+        """
+        Creates a new output xml file and prepares it for writing
+        :param out_file: output file/stream
+        """
+        self._out_file = out_file
+        self._lines = []
+        self._indent_count = 0
+
+    def write_class(self, class_node):
+        """
+        writes the xml of a class and closes the file
+        :param class_node: ClassNode
+        """
+        self._write_outer_tag("class")
+        self._write_token("keyword", "class")
+        self._write_token("identifier", class_node.name)
+        self._write_token("symbol", "{")
+        for var_dec in class_node.class_vars:
+            self._write_outer_tag("classVarDec")
+            self._write_token("keyword", var_dec.kind)
+            self._write_names(var_dec.var_type, var_dec.names)
+            self._write_outer_tag("classVarDec", True)
+        for subroutine in class_node.subroutines:
+            self._write_subroutine(subroutine)
+        self._write_token("symbol", "}")
+        self._write_outer_tag("class", True)
+        with open(self._out_file, 'w') as out_file:
+            out_file.write("".join(self._lines))
+
+    def _write_subroutine(self, subroutine):
+        """
+        :param subroutine: Subroutine
+        """
+        self._write_outer_tag("subroutineDec")
+        self._write_token("keyword", subroutine.kind)
+        self._write_type(subroutine.return_type)
+        self._write_token("identifier", subroutine.name)
+        self._write_token("symbol", "(")
+        self._write_outer_tag("parameterList")
+        for i, (param_type, param_name) in enumerate(subroutine.params):
+            if i:
+                self._write_token("symbol", ",")
+            self._write_type(param_type)
+            self._write_token("identifier", param_name)
+        self._write_outer_tag("parameterList", True)
+        self._write_token("symbol", ")")
+        self._write_outer_tag("subroutineBody")
+        self._write_token("symbol", "{")
+        for var_dec in subroutine.var_decs:
+            self._write_outer_tag("varDec")
+            self._write_token("keyword", "var")
+            self._write_names(var_dec.var_type, var_dec.names)
+            self._write_outer_tag("varDec", True)
+        self._write_statements(subroutine.statements)
+        self._write_token("symbol", "}")
+        self._write_outer_tag("subroutineBody", True)
+        self._write_outer_tag("subroutineDec", True)
+
+    def _write_names(self, var_type, names):
+        """
+        writes the type and the names of a declaration up to the ';'
+        """
+        self._write_type(var_type)
+        for i, name in enumerate(names):
+            if i:
+                self._write_token("symbol", ",")
+            self._write_token("identifier", name)
+        self._write_token("symbol", ";")
+
+    def _write_statements(self, statements):
+        """
+        :param statements: list of statement nodes
+        """
+        self._write_outer_tag("statements")
+        for statement in statements:
+            if isinstance(statement, Let):
+                self._write_outer_tag("letStatement")
+                self._write_token("keyword", "let")
+                self._write_token("identifier", statement.name)
+                if statement.index is not None:
+                    self._write_token("symbol", "[")
+                    self._write_expression(statement.index)
+                    self._write_token("symbol", "]")
+                self._write_token("symbol", "=")
+                self._write_expression(statement.value)
+                self._write_token("symbol", ";")
+                self._write_outer_tag("letStatement", True)
+            elif isinstance(statement, If):
+                self._write_outer_tag("ifStatement")
+                self._write_token("keyword", "if")
+                self._write_condition(statement.cond,
+                                      statement.then_statements)
+                if statement.else_statements is not None:
+                    self._write_token("keyword", "else")
+                    self._write_token("symbol", "{")
+                    self._write_statements(statement.else_statements)
+                    self._write_token("symbol", "}")
+                self._write_outer_tag("ifStatement", True)
+            elif isinstance(statement, While):
+                self._write_outer_tag("whileStatement")
+                self._write_token("keyword", "while")
+                self._write_condition(statement.cond, statement.statements)
+                self._write_outer_tag("whileStatement", True)
+            elif isinstance(statement, Do):
+                self._write_outer_tag("doStatement")
+                self._write_token("keyword", "do")
+                self._write_call(statement.call)
+                self._write_token("symbol", ";")
+                self._write_outer_tag("doStatement", True)
+            else:
+                self._write_outer_tag("returnStatement")
+                self._write_token("keyword", "return")
+                if statement.value is not None:
+                    self._write_expression(statement.value)
+                self._write_token("symbol", ";")
+                self._write_outer_tag("returnStatement", True)
+        self._write_outer_tag("statements", True)
+
+    def _write_condition(self, cond, statements):
+        """
+        writes ( cond ) { statements } of an if or a while
+        """
+        self._write_token("symbol", "(")
+        self._write_expression(cond)
+        self._write_token("symbol", ")")
+        self._write_token("symbol", "{")
+        self._write_statements(statements)
+        self._write_token("symbol", "}")
+
+    def _write_call(self, call):
+        """
+        writes the tokens of a subroutine call
+        :param call: Call
+        """
+        if call.receiver is not None:
+            self._write_token("identifier", call.receiver)
+            self._write_token("symbol", ".")
+        self._write_token("identifier", call.name)
+        self._write_token("symbol", "(")
+        self._write_outer_tag("expressionList")
+        for i, arg in enumerate(call.args):
+            if i:
+                self._write_token("symbol", ",")
+            self._write_expression(arg)
+        self._write_outer_tag("expressionList", True)
+        self._write_token("symbol", ")")
+
+    def _write_expression(self, expr):
+        """
+        the tree of a jack expression leans to the left, so the terms and
+        the operators are written flat from the leftmost term
+        :param expr: an expression node
+        """
+        self._write_outer_tag("expression")
+        ops = []
+        while isinstance(expr, BinaryOp):
+            ops.append(expr)
+            expr = expr.left
+        self._write_term(expr)
+        for op in reversed(ops):
+            self._write_op(op.op)
+            self._write_term(op.right)
+        self._write_outer_tag("expression", True)
+
+    def _write_term(self, term):
+        """
+        :param term: a term node
+        """
+        self._write_outer_tag("term")
+        if isinstance(term, IntConst):
+            self._write_token("integerConstant", term.value)
+        elif isinstance(term, StringConst):
+            self._write_token("stringConstant", term.value)
+        elif isinstance(term, KeywordConst):
+            self._write_token("keyword", term.word)
+        elif isinstance(term, Group):
+            self._write_token("symbol", "(")
+            self._write_expression(term.expr)
+            self._write_token("symbol", ")")
+        elif isinstance(term, UnaryOp):
+            self._write_op(term.op)
+            self._write_term(term.operand)
+        elif isinstance(term, VarRef):
+            self._write_token("identifier", term.name)
+        elif isinstance(term, ArrayRef):
+            self._write_token("identifier", term.name)
+            self._write_token("symbol", "[")
+            self._write_expression(term.index)
+            self._write_token("symbol", "]")
+        else:
+            self._write_call(term)
+        self._write_outer_tag("term", True)
+
+    def _write_type(self, var_type):
+        """
+        the primitive types are keywords and the class names identifiers
+        """
+        tag = "keyword" if var_type in TYPE_KEYWORDS else "identifier"
+        self._write_token(tag, var_type)
+
+    def _write_outer_tag(self, tag_str, end=False):
+        """
+        writes the outer tags of the different sections we are compiling
+        :param tag_str: the string of the current section we are compiling
+        :param end: true iff it is an end tag
+        """
+        if end:  # we decrease the indent count before the closing tag
+            self._indent_count -= 1
+            self._lines.append("\t" * self._indent_count + "</" + tag_str +
+                               ">\n")
+        else:  # we increase the indent count after the opening tag
+            self._lines.append("\t" * self._indent_count + "<" + tag_str +
+                               ">\n")
+            self._indent_count += 1
+
+    def _write_op(self, op):
+        """
+        writes an op symbol, escaped for xml
+        """
+        self._write_token("symbol", ESCAPED_SYMBOLS.get(op, op))
+
+    def _write_token(self, tag, token):
+        """
+        writes a token line
+        :param tag: the xml tag of the token type
+        :param token: the token
+        """
+        self._lines.append("\t" * self._indent_count + "<" + tag + "> " +
+                           str(token) + " </" + tag + ">\n")
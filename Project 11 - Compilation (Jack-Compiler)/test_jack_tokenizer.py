@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from JackTokenizer import *
+
+# a class with one integer constant
+INT_CONST_SOURCE = """
+class Main {
+    function void main() {
+        var int x;
+        let x = %s;
+        return;
+    }
+}
+"""
+
+
+class IntConstTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.path = os.path.join(self._dir.name, "Main.jack")
+
+    def _lex(self, value, mapped):
+        """
+        :param value: the integer constant in the source
+        :param mapped: true to tokenize the bytes of the mapped file
+        :return: the error that was printed, None if there was no error
+        """
+        with open(self.path, "w") as jack_file:
+            jack_file.write(INT_CONST_SOURCE % value)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                JackTokenizer(self.path, whole_file=True, mapped=mapped)
+            except SystemExit:
+                return out.getvalue().strip()
+        return None
+
+    def _line_mode_type(self, value):
+        """
+        :param value: the integer constant in the source
+        :return: the type line mode gives the constant
+        """
+        with open(self.path, "w") as jack_file:
+            jack_file.write(INT_CONST_SOURCE % value)
+        tokenizer = JackTokenizer(self.path)
+        while tokenizer.curr_token != value:
+            tokenizer.advance()
+        return tokenizer.token_type()
+
+    def test_in_range(self):
+        for value in ("0", "32767"):
+            self.assertIsNone(self._lex(value, False))
+            self.assertIsNone(self._lex(value, True))
+            self.assertEqual(self._line_mode_type(value), "INT_CONST")
+
+    def test_out_of_range(self):
+        for value in ("32768", "40000", "123456789"):
+            self.assertEqual(self._lex(value, False), INT_CONST_ERROR)
+            self.assertEqual(self._lex(value, True), INT_CONST_ERROR)
+            self.assertNotEqual(self._line_mode_type(value), "INT_CONST")
+
+
+if __name__ == '__main__':
+    unittest.main()
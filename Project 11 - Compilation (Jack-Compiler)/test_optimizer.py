@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from JackCompiler import compile_file
+from CodeGenerator import MAX_MATH_COMMANDS
+from Optimizer import DEFAULT_OPTIMIZATIONS
+
+# Math.divide changes a static, so test has to read it after the division
+DIVIDE_CHANGES_STATIC = """
+class Math {
+    static int c;
+    function int divide(int a, int b) { let c = 7; return a; }
+    function int test(int a, int b) {
+        var int x;
+        let c = 0;
+        let x = %s;
+        return c;
+    }
+}
+"""
+
+# Math.divide changes a static that the loop reads
+DIVIDE_IN_LOOP = """
+class Math {
+    static int c;
+    function int divide(int a, int b) { let c = c + 1; return a; }
+    function int test(int a, int b, int n) {
+        var int s, x, i;
+        while (i < n) {
+            let s = s + (c + 1);
+            let x = %s;
+            let i = i + 1;
+        }
+        return s;
+    }
+}
+"""
+
+# a division of an argument by a constant
+DIVIDE_BY = """
+class Main {
+    function int test(int a) { return a / %s; }
+}
+"""
+
+
+def compile_source(source, optimizations):
+    """
+    :param source: the jack code of a class
+    :param optimizations: the names of the optimizations to make
+    :return: the vm commands of every function, by its name
+    """
+    with tempfile.TemporaryDirectory() as dir_path:
+        in_path = os.path.join(dir_path, "Main.jack")
+        out_path = os.path.join(dir_path, "Main.vm")
+        with open(in_path, "w") as in_file:
+            in_file.write(source)
+        error, stats = compile_file(in_path, out_path, None, None,
+                                    optimizations)
+        if error is not None:
+            raise AssertionError(error)
+        with open(out_path) as out_file:
+            lines = out_file.read().splitlines()
+    functions = {}
+    for line in lines:
+        if line.startswith("function "):
+            commands = functions[line.split()[1]] = []
+        else:
+            commands.append(line)
+    return functions
+
+
+class PropagateConstantsTest(unittest.TestCase):
+
+    def test_static_forgotten_after_division(self):
+        commands = compile_source(DIVIDE_CHANGES_STATIC % "a / b",
+                                  DEFAULT_OPTIMIZATIONS)["Math.test"]
+        self.assertEqual(commands[-2:], ["push static 0", "return"])
+
+    def test_static_forgotten_after_multiplication(self):
+        commands = compile_source(DIVIDE_CHANGES_STATIC % "a * b",
+                                  ["constprop"])["Math.test"]
+        self.assertEqual(commands[-2:], ["push static 0", "return"])
+
+    def test_static_forgotten_after_string(self):
+        commands = compile_source(DIVIDE_CHANGES_STATIC % '"ab"',
+                                  ["constprop"])["Math.test"]
+        self.assertEqual(commands[-2:], ["push static 0", "return"])
+
+    def test_static_kept_without_call(self):
+        commands = compile_source(DIVIDE_CHANGES_STATIC % "a + b",
+                                  ["constprop"])["Math.test"]
+        self.assertEqual(commands[-2:], ["push constant 0", "return"])
+
+
+class HoistInvariantsTest(unittest.TestCase):
+
+    def _reads_static_before_loop(self, value):
+        commands = compile_source(DIVIDE_IN_LOOP % value,
+                                  ["licm"])["Math.test"]
+        loop = commands.index("label WHILE0")
+        return "push static 0" in commands[:loop]
+
+    def test_not_hoisted_over_division(self):
+        self.assertFalse(self._reads_static_before_loop("a / b"))
+
+    def test_not_hoisted_over_multiplication(self):
+        self.assertFalse(self._reads_static_before_loop("a * b"))
+
+    def test_hoisted_without_call(self):
+        self.assertTrue(self._reads_static_before_loop("a + b"))
+
+
+
+class StrengthTest(unittest.TestCase):
+
+    def _divide(self, value):
+        return compile_source(DIVIDE_BY % value, ["strength"])["Main.test"]
+
+    def test_small_power_calls_divide(self):
+        for value in ("2", "16", "2048"):
+            self.assertIn("call Math.divide 2", self._divide(value))
+
+    def test_large_power_is_shifted(self):
+        for value in ("4096", "16384"):
+            commands = self._divide(value)
+            self.assertNotIn("call Math.divide 2", commands)
+            # without the push of the argument and the return
+            self.assertLessEqual(len(commands) - 2, MAX_MATH_COMMANDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from JackTokenizer import *
+from TokenCache import CACHE_DIR, CACHE_SUFFIX, TokenCache
+
+CLASS_SOURCE = "class Main { function void main() { return; } }\n"
+
+
+def make_stream():
+    """
+    :return: a TokenStream of a few tokens
+    """
+    stream = TokenStream()
+    stream.append(KEYWORD_T, "class", 1, 0)
+    stream.append(IDENTIFIER_T, "Main", 1, 6)
+    stream.append(SYMBOL_T, "{", 1, 11)
+    stream.append(IDENTIFIER_T, "Main", 2, 0)
+    return stream
+
+
+class TokenStreamTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        stream = TokenStream.from_bytes(make_stream().to_bytes())
+        self.assertEqual(stream.table, ["class", "Main", "{"])
+        self.assertEqual(list(stream.types),
+                         [KEYWORD_T, IDENTIFIER_T, SYMBOL_T, IDENTIFIER_T])
+        self.assertEqual(list(stream.values), [0, 1, 2, 1])
+
+    def test_bad_string_table(self):
+        data = bytearray(make_stream().to_bytes())
+        data[STREAM_HEADER.size] = 0xff
+        data[STREAM_HEADER.size + 1] = 0xfe
+        self.assertIsNone(TokenStream.from_bytes(bytes(data)))
+
+    def test_value_out_of_table(self):
+        stream = make_stream()
+        stream.values[3] = len(stream.table)
+        self.assertIsNone(TokenStream.from_bytes(stream.to_bytes()))
+
+    def test_bad_type_code(self):
+        stream = make_stream()
+        stream.types[0] = len(TYPE_NAMES)
+        self.assertIsNone(TokenStream.from_bytes(stream.to_bytes()))
+
+    def test_truncated(self):
+        data = make_stream().to_bytes()
+        self.assertIsNone(TokenStream.from_bytes(data[:-1]))
+
+
+class TokenCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.path = os.path.join(self._dir.name, "Main.jack")
+        with open(self.path, "w") as jack_file:
+            jack_file.write(CLASS_SOURCE)
+        self.cache = TokenCache(self._dir.name, "test")
+
+    def test_corrupt_file_is_tokenized_again(self):
+        key = self.cache.key(self.path)
+        tokens = JackTokenizer(self.path, whole_file=True, cache=self.cache)
+        cache_path = os.path.join(self._dir.name, CACHE_DIR,
+                                  key + CACHE_SUFFIX)
+        with open(cache_path, "rb") as cache_file:
+            data = bytearray(cache_file.read())
+        data[STREAM_HEADER.size] ^= 0xff
+        data[STREAM_HEADER.size + 1] ^= 0xff
+        with open(cache_path, "wb") as cache_file:
+            cache_file.write(data)
+        self.assertIsNone(self.cache.load(key))
+        again = JackTokenizer(self.path, whole_file=True, cache=self.cache)
+        self.assertEqual(again.stream.table, tokens.stream.table)
+        self.assertIsNotNone(self.cache.load(key))
+
+    def test_keep_only_drops_old_versions(self):
+        JackTokenizer(self.path, whole_file=True, cache=self.cache)
+        with open(self.path, "a") as jack_file:
+            jack_file.write("// changed\n")
+        JackTokenizer(self.path, whole_file=True, cache=self.cache)
+        cache_dir = os.path.join(self._dir.name, CACHE_DIR)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        self.cache.keep_only([self.path])
+        self.assertEqual(os.listdir(cache_dir),
+                         [self.cache.key(self.path) + CACHE_SUFFIX])
+        self.assertIsNotNone(self.cache.load(self.cache.key(self.path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
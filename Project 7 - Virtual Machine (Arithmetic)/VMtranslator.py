@@ -12,62 +12,107 @@ NUM_OF_ARG = 2
 SECOND_ARG = 2
 FIRST_ARG = 1
 INVALID_TYPE = ""
-RETURN_TYPE = "C_RETURN"
-NO_COMMAND = -1
 BINARY = 0
 UNARY = 1
 BOOL = 2
-REGEX = "^(?:(?!\/\/).)*[a-z0-9]+"
+# the opcodes of the decoded commands
+C_PUSH = 0
+C_POP = 1
+C_ARITHMETIC = 2
+COMMAND_PATTERN = re.compile("^(?:(?!\/\/).)*[a-z0-9]+")
+
+
+class Command:
+    """
+    a vm command, decoded once
+    """
+    __slots__ = ("type", "arg1", "arg2", "line")
+
+    def __init__(self, command_type, arg1, arg2, line):
+        """
+        :param command_type: the opcode of the command (see Parser.TYPES)
+        :param arg1: the first argument (the command itself for arithmetic)
+        :param arg2: int, the second argument
+        :param line: the line of the command, without its comment
+        """
+        self.type = command_type
+        self.arg1 = arg1
+        self.arg2 = arg2
+        self.line = line
+
+
+def decode_commands(file):
+    """
+    reads a vm file one line at a time and decodes every command once
+    :param file: the vm file
+    :return: a generator of the Commands of the file
+    """
+    with open(file) as vm_file:
+        for line in vm_file:
+            match = COMMAND_PATTERN.match(line)
+            if match is None:
+                continue
+            curr_line = match.group(0)
+            words = curr_line.split()
+            command_type = Parser.TYPES.get(words[0])
+            if command_type is None:
+                print(WRONG_COMMAND)
+                sys.exit()
+            if command_type == C_ARITHMETIC:
+                yield Command(command_type, words[0], INVALID_TYPE, curr_line)
+            elif len(words) > SECOND_ARG:
+                yield Command(command_type, words[FIRST_ARG],
+                              int(words[SECOND_ARG]), curr_line)
+            elif len(words) > FIRST_ARG:
+                yield Command(command_type, words[FIRST_ARG], INVALID_TYPE,
+                              curr_line)
+            else:
+                yield Command(command_type, INVALID_TYPE, INVALID_TYPE,
+                              curr_line)
 
 
 class Parser:
     """
     parses each VM command into it's lexical elements
     """
-    BINARY_T = {"C_PUSH", "C_POP", "C_FUNCTION", "C_CALL"}
     ARITHMETIC_T = {"add", "sub", "neg", "eq", "and", "or", "not", "gt", "lt"}
+    # the type of every command by its first word
+    TYPES = dict([("push", C_PUSH), ("pop", C_POP)] +
+                 [(name, C_ARITHMETIC) for name in ARITHMETIC_T])
 
     def __init__(self, file):
         """
-        the parser constructor
+        the parser constructor - the commands are read from the file while
+        they are parsed, one ahead of the current one
         :param file: the file we wish to parse
         """
-        self.__lines = []
-        for line in open(file):
-            curr_line = "".join(re.findall(REGEX, line))
-            if curr_line:
-                self.__lines.append(curr_line)
-        self.__num_of_commands = len(self.__lines)
-        self.__current_command = NO_COMMAND
+        self.__commands = decode_commands(file)
+        self.__current = None
+        self.__next = next(self.__commands, None)
 
     def has_more_commands(self):
         """
         boolean function that checks if there are more commands to parse
         :return: true iff there are more commands to parse
         """
-        return self.__current_command < self.__num_of_commands - 1
+        return self.__next is not None
 
     def advance(self):
         """
-        increments the current command counter every time we parse a command
+        moves on to the next command
         :return: if there are no more commands
         """
         if not self.has_more_commands():
             return
-        self.__current_command += 1
+        self.__current = self.__next
+        self.__next = next(self.__commands, None)
 
     def command_type(self):
         """
         gets the command type
-        :return: "C_ARITHMETIC" if arithmetic, "C_PUSH/POP" if push/pop
+        :return: C_ARITHMETIC if arithmetic, C_PUSH/C_POP if push/pop
         """
-        curr_arg1 = self.__lines[self.__current_command].split(' ', 1)[0]
-        if curr_arg1 in Parser.ARITHMETIC_T:
-            return "C_ARITHMETIC"
-        if curr_arg1 == "push":
-            return "C_PUSH"
-        else:
-            return "C_POP"
+        return self.__current.type
 
     def arg1(self):
         """
@@ -75,29 +120,21 @@ class Parser:
         C ARITHMETIC the command itself (add, sub etc.), is returned.
         :return: a string of the first argument of the current command
         """
-        curr_line = self.__lines[self.__current_command]
-        if curr_line == RETURN_TYPE:
-            return INVALID_TYPE
-        if curr_line in Parser.ARITHMETIC_T:
-            return curr_line
-        return curr_line.split(' ', 2)[FIRST_ARG]
+        return self.__current.arg1
 
     def arg2(self):
         """
         returns the second argument of the current command
         :return: int (the index argument of the command)
         """
-        if self.command_type() not in Parser.BINARY_T:
-            return INVALID_TYPE
-
-        return self.__lines[self.__current_command].split(' ', 2)[SECOND_ARG]
+        return self.__current.arg2
 
     def get_curr_line(self):
         """
         gets the current line we are parsing
         :return: the current line
         """
-        return self.__lines[self.__current_command]
+        return self.__current.line
 
 
 class CodeWriter(object):
@@ -149,13 +186,13 @@ class CodeWriter(object):
         """
         self._write("\n// " + line)
         self._write_address(segment, index)
-        if command == 'C_PUSH':  # we want to load M[address] to D
+        if command == C_PUSH:  # we want to load M[address] to D
             if segment == 'constant':
                 self._write('D=A')
             else:
                 self._write('D=M')
             self._push_to_stack()
-        elif command == 'C_POP':  # we want to load D to M[address]
+        elif command == C_POP:  # we want to load D to M[address]
             self._write('D=A')
             self._write('@R13')  # keep address in R13
             self._write('M=D')
@@ -371,7 +408,7 @@ def translate_to_assembler(file, code_writer):
     while parser.has_more_commands():
         parser.advance()
         curr_type = parser.command_type()
-        if curr_type in ["C_PUSH", "C_POP"]:
+        if curr_type == C_PUSH or curr_type == C_POP:
             code_writer.write_push_pop(curr_type, parser.arg1(), parser.arg2(),
                                        parser.get_curr_line())
         else:
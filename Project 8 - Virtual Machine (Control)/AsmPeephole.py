@@ -0,0 +1,207 @@
+"""
+the peephole optimization of the translator - short sequences of hack
+instructions are replaced by shorter ones, over the lines of the whole
+program before they are written
+"""
+import re
+import sys
+
+UNKNOWN_RULE_ERROR = "unknown asm rule"
+
+# name, pattern, replacement. a pattern is a list of instructions, {x} in it
+# matches any text without spaces (the same text wherever x is in the
+# pattern) and is put instead of {x} in the replacement. a rule may have a
+# few patterns, and a pattern may match what another rule wrote. labels are
+# never in a pattern, so nothing is matched across a jump target
+ASM_RULES = [
+    # push D, pop D - the value is already in D. it is left above the stack
+    # (nothing reads there), A is set right after
+    ("push-pop",
+     ["@SP", "A=M", "M=D", "@SP", "M=M+1",
+      "@SP", "M=M-1", "A=M", "D=M", "@{a}"],
+     ["@{a}"]),
+    ("push-pop",
+     ["@SP", "A=M", "M=D", "@SP", "M=M+1",
+      "@SP", "AM=M-1", "D=M", "@{a}"],
+     ["@{a}"]),
+    # SP++, SP-- (A is SP in both)
+    ("inc-dec",
+     ["@SP", "M=M+1", "@SP", "M=M-1"],
+     ["@SP"]),
+    ("inc-dec",
+     ["@SP", "M=M+1", "@SP", "AM=M-1"],
+     ["@SP", "A=M"]),
+    # SP--, A = SP
+    ("dec-load",
+     ["@SP", "M=M-1", "A=M"],
+     ["@SP", "AM=M-1"]),
+    ("dec-load",
+     ["@SP", "M=M-1", "@SP", "A=M"],
+     ["@SP", "AM=M-1"]),
+    # pop to a fixed address (static, temp, pointer) without keeping the
+    # address in R13
+    ("direct-pop",
+     ["@{a}", "D=A", "@R13", "M=D",
+      "@SP", "AM=M-1", "D=M", "@R13", "A=M", "M=D"],
+     ["@SP", "AM=M-1", "D=M", "@{a}", "M=D"]),
+    # a binary or unary operation on the top of the stack in place, instead
+    # of SP-- and SP++ around it (as written, or after dec-load)
+    ("in-place",
+     ["@SP", "M=M-1", "@SP", "A=M", "M=M{op}D", "@SP", "M=M+1"],
+     ["@SP", "A=M-1", "M=M{op}D"]),
+    ("in-place",
+     ["@SP", "M=M-1", "@SP", "A=M", "M={op}M", "@SP", "M=M+1"],
+     ["@SP", "A=M-1", "M={op}M"]),
+    ("in-place",
+     ["@SP", "AM=M-1", "M=M{op}D", "@SP", "M=M+1"],
+     ["@SP", "A=M-1", "M=M{op}D"]),
+    ("in-place",
+     ["@SP", "AM=M-1", "M={op}M", "@SP", "M=M+1"],
+     ["@SP", "A=M-1", "M={op}M"]),
+    # A is still SP - 1 after the pop
+    ("reload-sp",
+     ["@SP", "AM=M-1", "D=M", "@SP", "A=M-1"],
+     ["@SP", "AM=M-1", "D=M", "A=A-1"]),
+    # the address of a segment is computed straight into D
+    ("offset-address",
+     ["A=D+A", "D=A", "@{a}"],
+     ["D=D+A", "@{a}"]),
+    # index 0 of local, argument, this and that
+    ("zero-offset",
+     ["@{s}", "D=M", "@0", "A=D+A", "D=M"],
+     ["@{s}", "A=M", "D=M"]),
+    ("zero-offset",
+     ["@{s}", "D=M", "@0", "D=D+A", "@{a}"],
+     ["@{s}", "D=M", "@{a}"]),
+    # index 1 of them
+    ("offset-one",
+     ["@1", "A=D+A"],
+     ["A=D+1"]),
+    ("offset-one",
+     ["@1", "D=D+A", "@{a}"],
+     ["D=D+1", "@{a}"]),
+    # push constant 0 and 1
+    ("small-constant",
+     ["@0", "D=A", "@{a}"],
+     ["D=0", "@{a}"]),
+    ("small-constant",
+     ["@1", "D=A", "@{a}"],
+     ["D=1", "@{a}"]),
+]
+
+ASM_RULE_NAMES = list(dict.fromkeys(name for name, pattern, replacement
+                                    in ASM_RULES))
+
+MAX_PATTERN = max(len(pattern) for name, pattern, replacement in ASM_RULES)
+
+
+def _compile(line):
+    """
+    :param line: a line of a pattern
+    :return: a regular expression that matches the line
+    """
+    regex = ""
+    names = []
+    for i, part in enumerate(re.split(r"\{(\w+)\}", line)):
+        if i % 2 == 0:
+            regex += re.escape(part)
+        elif part in names:
+            regex += "(?P=" + part + ")"
+        else:
+            regex += "(?P<" + part + r">\S+)"
+            names.append(part)
+    return re.compile(regex)
+
+
+# the rules with the lines of their patterns compiled
+_COMPILED_RULES = [(name, [_compile(line) for line in pattern], replacement)
+                   for name, pattern, replacement in ASM_RULES]
+
+
+def parse_asm_rules(names):
+    """
+    :param names: a comma separated list of asm rules, 'all' or 'none'
+    :return: the list of the rules names. prints unknown asm rule error if
+    one of the names is not known and exits the program
+    """
+    if names == "all":
+        return list(ASM_RULE_NAMES)
+    if names == "none":
+        return []
+    chosen = set(name.strip() for name in names.split(",") if name.strip())
+    for name in chosen:
+        if name not in ASM_RULE_NAMES:
+            print(UNKNOWN_RULE_ERROR + ": " + name)
+            sys.exit()
+    return [name for name in ASM_RULE_NAMES if name in chosen]
+
+
+def _match(pattern, instructions, start):
+    """
+    :param pattern: the compiled lines of a pattern
+    :param instructions: list of [comments, instruction, line]
+    :param start: where the window starts
+    :return: dict of what every {x} of the pattern matched, None if the
+    pattern does not match there
+    """
+    if start + len(pattern) > len(instructions):
+        return None
+    bindings = {}
+    for i, regex in enumerate(pattern):
+        match = regex.fullmatch(instructions[start + i][1])
+        if match is None:
+            return None
+        for name, value in match.groupdict().items():
+            if bindings.setdefault(name, value) != value:
+                return None
+    return bindings
+
+
+def optimize(lines, rule_names, stats):
+    """
+    slides a window over the instructions and replaces the first pattern
+    that matches at every place, after a change we go back a window so the
+    new instructions are matched again, until no pattern matches. comments
+    are not instructions - they stay before the instruction after them
+    :param lines: the lines that were written - instructions, labels and
+    comments
+    :param rule_names: the names of the rules to run
+    :param stats: dict of how many times every rule matched, updated
+    :return: the lines after the rules
+    """
+    rules = [rule for rule in _COMPILED_RULES if rule[0] in rule_names]
+    instructions = []
+    comments = []
+    for line in lines:
+        instruction = line.split("//")[0].strip()
+        if instruction:
+            instructions.append([comments, instruction, line])
+            comments = []
+        else:
+            comments.append(line)
+
+    i = 0
+    while i < len(instructions):
+        for name, pattern, replacement in rules:
+            bindings = _match(pattern, instructions, i)
+            if bindings is None:
+                continue
+            window = instructions[i:i + len(pattern)]
+            new = []
+            for line in replacement:
+                line = line.format(**bindings)
+                new.append([[], line, line])
+            new[0][0] = [comment for instruction in window
+                         for comment in instruction[0]]
+            instructions[i:i + len(pattern)] = new
+            stats[name] += 1
+            i = max(i - MAX_PATTERN + 1, 0)
+            break
+        else:
+            i += 1
+
+    out = []
+    for instruction in instructions:
+        out.extend(instruction[0])
+        out.append(instruction[2])
+    return out + comments
@@ -0,0 +1,336 @@
+"""
+the link step of the translator - the vm files of a program are read
+together and changed as a whole before they are translated
+"""
+
+ENTRY_FUNCTION = "Sys.init"
+
+BINARY_COMMANDS = {"add", "sub", "and", "or", "eq", "gt", "lt"}
+
+UNARY_COMMANDS = {"neg", "not"}
+
+
+class VMFunction:
+    """
+    a function of the program and its commands
+    """
+    __slots__ = ("name", "file", "n_locals", "commands")
+
+    def __init__(self, name, file, n_locals, commands):
+        """
+        :param name: the name of the function, None for the commands before
+        the first function of a file
+        :param file: the name of its vm file (without .vm), its statics are
+        of that file
+        :param n_locals: int
+        :param commands: its commands after the function command, tuples of
+        the words of every command. a push or pop of a static of another
+        file has the name of that file as a fourth word
+        """
+        self.name = name
+        self.file = file
+        self.n_locals = n_locals
+        self.commands = commands
+
+
+def split_functions(file_name, commands):
+    """
+    :param file_name: the name of the vm file (without .vm)
+    :param commands: the commands of the file, tuples of their words
+    :return: list of the VMFunctions of the file
+    """
+    functions = [VMFunction(None, file_name, 0, [])]
+    for command in commands:
+        if command[0] == "function":
+            functions.append(VMFunction(command[1], file_name,
+                                        int(command[2]), []))
+        else:
+            functions[-1].commands.append(command)
+    if not functions[0].commands:
+        del functions[0]
+    return functions
+
+
+def inline_functions(functions, max_size):
+    """
+    writes the bodies of the small functions instead of the calls of them.
+    the arguments of the call are popped into new locals of the caller, the
+    locals of the callee get new locals too (set to 0 as the function
+    command does), its labels are renamed and its returns jump to its end.
+    a return leaves only the return value on the stack (a "do" before it may
+    leave its value under it). a callee that sets pointer 0 or 1 gets them
+    back at its end, as return does. a callee gets the callees it calls
+    written in it before it is written anywhere, so nothing that was inlined
+    is called again - only a call in a cycle of calls stays a call
+    :param functions: list of VMFunctions, changed in place
+    :param max_size: the most commands a function may have to be inlined
+    :return: the number of the calls that were inlined
+    """
+    callees = dict((function.name, function) for function in functions
+                   if _can_inline(function, max_size))
+    # copies of the callees with their own calls inlined
+    bodies = {}
+    inlined = 0
+    for name in _callee_order(callees):
+        callee = callees[name]
+        body = VMFunction(name, callee.file, callee.n_locals,
+                          list(callee.commands))
+        inlined += _inline_calls(body, callees, bodies, inlined)
+        bodies[name] = body
+    for function in functions:
+        # the commands before the first function have no frame for the
+        # arguments, and the callees get their copies after all the others
+        if function.name is not None and function.name not in bodies:
+            inlined += _inline_calls(function, callees, bodies, inlined)
+    for function in functions:
+        if function.name in bodies:
+            function.commands = bodies[function.name].commands
+            function.n_locals = bodies[function.name].n_locals
+    return inlined
+
+
+def _callee_order(callees):
+    """
+    :param callees: dict of the VMFunctions to inline by their names
+    :return: their names, each after the callees it calls (in a cycle of
+    calls the one that is reached first is the last)
+    """
+    order = []
+    seen = set()
+    for first in callees:
+        if first in seen:
+            continue
+        seen.add(first)
+        stack = [(first, _calls_of(callees[first], callees))]
+        while stack:
+            name, calls = stack[-1]
+            for called in calls:
+                if called not in seen:
+                    seen.add(called)
+                    stack.append((called,
+                                  _calls_of(callees[called], callees)))
+                    break
+            else:
+                stack.pop()
+                order.append(name)
+    return order
+
+
+def _calls_of(function, callees):
+    """
+    :param function: VMFunction
+    :param callees: dict of the VMFunctions to inline by their names
+    :return: an iterator over the names of the callees the function calls
+    """
+    return iter([command[1] for command in function.commands
+                 if command[0] == "call" and command[1] in callees])
+
+
+def _inline_calls(caller, callees, bodies, site):
+    """
+    writes the bodies instead of the calls of them in a function
+    :param caller: VMFunction, changed in place
+    :param callees: dict of the VMFunctions to inline by their names
+    :param bodies: dict of copies of the callees with their own calls
+    inlined, by their names - only these are inlined
+    :param site: the number of the first call that is inlined, the next
+    ones get the numbers after it
+    :return: the number of the calls that were inlined
+    """
+    commands = []
+    n_locals = caller.n_locals
+    inlined = 0
+    for command in caller.commands:
+        copy = bodies.get(command[1]) if command[0] == "call" else None
+        if copy is None or copy.name == caller.name or \
+                _max_argument(copy.commands) >= int(command[2]):
+            commands.append(command)
+            continue
+        body, extra = _inline_body(callees[copy.name], copy.commands,
+                                   int(command[2]), caller, site + inlined,
+                                   copy.n_locals)
+        commands.extend(body)
+        n_locals = max(n_locals, caller.n_locals + extra)
+        inlined += 1
+    caller.commands = commands
+    caller.n_locals = n_locals
+    return inlined
+
+
+def _can_inline(function, max_size):
+    """
+    :param function: VMFunction
+    :param max_size: the most commands a function may have to be inlined
+    :return: true if the function is small, does not call itself, returns
+    (one that never does saves nothing) and the depth of its stack is known
+    at every return (the values under the return value are dropped there)
+    """
+    if function.name is None or function.name == ENTRY_FUNCTION or \
+            len(function.commands) > max_size or \
+            ("return",) not in function.commands:
+        return False
+    if any(command[:2] == ("call", function.name)
+           for command in function.commands):
+        return False
+    return _stack_depths(function.commands) is not None
+
+
+def _stack_depths(commands):
+    """
+    follows the depth of the stack of the function along all its paths
+    :param commands: the commands of a function
+    :return: dict of the depth before every command that is reached, None if
+    the depth is not the same wherever paths meet, it reads below the start
+    or there is no value at a return
+    """
+    labels = dict((command[1], i) for i, command in enumerate(commands)
+                  if command[0] == "label")
+    depths = {}
+    work = [(0, 0)]
+    while work:
+        i, depth = work.pop()
+        while True:
+            if i >= len(commands) or depth < 0:
+                return None
+            if i in depths:
+                if depths[i] != depth:
+                    return None
+                break
+            depths[i] = depth
+            command = commands[i]
+            name = command[0]
+            if name == "return":
+                if depth < 1:
+                    return None
+                break
+            if name == "push":
+                depth += 1
+            elif name == "pop":
+                depth -= 1
+            elif name in BINARY_COMMANDS:
+                if depth < 2:  # reads the stack of the caller
+                    return None
+                depth -= 1
+            elif name in UNARY_COMMANDS:
+                if depth < 1:
+                    return None
+            elif name == "call":
+                depth -= int(command[2])
+                if depth < 0:
+                    return None
+                depth += 1
+            elif name in ("goto", "if-goto"):
+                if command[1] not in labels:
+                    return None
+                if name == "if-goto":
+                    depth -= 1
+                    work.append((i + 1, depth))
+                i = labels[command[1]]
+                continue
+            elif name != "label":
+                return None
+            i += 1
+    return depths
+
+
+def _max_argument(commands):
+    """
+    :param commands: the commands of a function
+    :return: the largest index of the argument segment it uses, -1 if none
+    """
+    return max([int(command[2]) for command in commands
+                if command[1:2] == ("argument",)] + [-1])
+
+
+def _inline_body(callee, body, n_args, caller, site, n_locals=None):
+    """
+    :param callee: the VMFunction that is called
+    :param body: its commands, maybe with the callees it calls inlined
+    :param n_args: the number of arguments of the call
+    :param caller: the VMFunction the call is in
+    :param site: a number that is different for every inlined call
+    :param n_locals: the number of locals the body uses, None if it is that
+    of the callee. only those of the callee are set to 0, the others are of
+    inlined calls that set them first
+    :return: the commands to write instead of the call, and how many locals
+    the caller needs for them after its own
+    """
+    if n_locals is None:
+        n_locals = callee.n_locals
+    base = caller.n_locals
+    first_local = base + n_args
+    # an inlined call in the body sets the pointers back itself
+    saves = [pointer for pointer in ("0", "1")
+             if ("pop", "pointer", pointer) in callee.commands]
+    first_save = first_local + n_locals
+    prefix = callee.name + "$" + str(site)
+    end_label = prefix + ".end"
+    depths = _stack_depths(body)
+
+    commands = []
+    for i in range(n_args - 1, -1, -1):
+        commands.append(("pop", "local", str(base + i)))
+    for i in range(callee.n_locals):
+        commands.append(("push", "constant", "0"))
+        commands.append(("pop", "local", str(first_local + i)))
+    for i, pointer in enumerate(saves):
+        commands.append(("push", "pointer", pointer))
+        commands.append(("pop", "local", str(first_save + i)))
+    for i, command in enumerate(body):
+        name = command[0]
+        if name == "return":
+            extra = depths.get(i, 1) - 1
+            if extra:  # the values under the return value are dropped
+                commands.append(("pop", "temp", "0"))
+                commands.extend([("pop", "temp", "1")] * extra)
+                commands.append(("push", "temp", "0"))
+            if i < len(body) - 1:
+                commands.append(("goto", end_label))
+        elif name in ("label", "goto", "if-goto"):
+            commands.append((name, prefix + "$" + command[1]))
+        elif command[1:2] == ("argument",):
+            # the arguments were popped from the top, argument i is in
+            # local base + i
+            commands.append((name, "local", str(base + int(command[2]))))
+        elif command[1:2] == ("local",):
+            commands.append((name, "local",
+                             str(first_local + int(command[2]))))
+        elif command[1:2] == ("static",) and len(command) == 3 and \
+                callee.file != caller.file:
+            commands.append(command + (callee.file,))
+        else:
+            commands.append(command)
+    if any(command[0] == "return" for command in body[:-1]):
+        commands.append(("label", end_label))
+    for i, pointer in enumerate(saves):
+        commands.append(("push", "local", str(first_save + i)))
+        commands.append(("pop", "pointer", pointer))
+    return commands, n_args + n_locals + len(saves)
+
+
+def remove_unreachable(functions):
+    """
+    removes the functions that can not be called - a call graph from the
+    call commands, starting at Sys.init (and at the commands before the
+    first function of a file). without Sys.init nothing is removed
+    :param functions: list of VMFunctions, changed in place
+    :return: list of the removed VMFunctions
+    """
+    by_name = dict((function.name, function) for function in functions)
+    if ENTRY_FUNCTION not in by_name:
+        return []
+    reached = set([ENTRY_FUNCTION])
+    work = [by_name[ENTRY_FUNCTION]] + [function for function in functions
+                                         if function.name is None]
+    while work:
+        function = work.pop()
+        for command in function.commands:
+            if command[0] == "call" and command[1] not in reached and \
+                    command[1] in by_name:
+                reached.add(command[1])
+                work.append(by_name[command[1]])
+    removed = [function for function in functions
+               if function.name is not None and function.name not in reached]
+    functions[:] = [function for function in functions
+                    if function.name is None or function.name in reached]
+    return removed
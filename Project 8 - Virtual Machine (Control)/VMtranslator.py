@@ -1,77 +1,137 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import sys
 import re
+from VMLinker import *
+from AsmPeephole import *
 
 SEG_TO_RESTORE = ["THAT", "THIS", "ARG", "LCL"]
 
 WRONG_COMMAND = "Invalid command"
 
 NO_SUCH_FILE_ERROR = "There is no such file: "
-ARG_ERROR = "Illegal number of arguments "
-REGEX = "^(?:(?!\/\/).)*[a-zA-Z0-9]+"
-RETURN_TYPE = "C_RETURN"
-NUM_OF_ARG = 2
+REMOVED_FUNCTION = "removed {} ({} words)"
+REMOVED_TOTAL = "removed {} functions, {} words saved"
+# the label of the shared routine of a boolean operator
+COMPARE_ROUTINE = "${}"
+CALL_ROUTINE = "$CALL"
+RETURN_ROUTINE = "$RETURN"
+COMMAND_PATTERN = re.compile("^(?:(?!\/\/).)*[a-zA-Z0-9]+")
 SECOND_ARG = 2
 FIRST_ARG = 1
 INVALID_TYPE = ""
-NO_COMMAND = -1
 BINARY = 0
 UNARY = 1
 BOOL = 2
+# the opcodes of the decoded commands
+C_PUSH = 0
+C_POP = 1
+C_ARITHMETIC = 2
+C_LABEL = 3
+C_GOTO = 4
+C_IF = 5
+C_FUNCTION = 6
+C_CALL = 7
+C_RETURN = 8
+
+
+class Command:
+    """
+    a vm command, decoded once
+    """
+    __slots__ = ("type", "arg1", "arg2", "line")
+
+    def __init__(self, command_type, arg1, arg2, line):
+        """
+        :param command_type: the opcode of the command (see Parser.TYPES)
+        :param arg1: the first argument (the command itself for arithmetic)
+        :param arg2: int, the second argument
+        :param line: the line of the command, without its comment
+        """
+        self.type = command_type
+        self.arg1 = arg1
+        self.arg2 = arg2
+        self.line = line
+
+
+def decode_commands(file):
+    """
+    reads a vm file one line at a time and decodes every command once
+    :param file: the vm file
+    :return: a generator of the Commands of the file
+    """
+    with open(file) as vm_file:
+        for line in vm_file:
+            match = COMMAND_PATTERN.match(line)
+            if match is None:
+                continue
+            curr_line = match.group(0)
+            words = curr_line.split()
+            command_type = Parser.TYPES.get(words[0])
+            if command_type is None:
+                print(WRONG_COMMAND)
+                sys.exit()
+            if command_type == C_ARITHMETIC:
+                yield Command(command_type, words[0], INVALID_TYPE, curr_line)
+            elif len(words) > SECOND_ARG:
+                yield Command(command_type, words[FIRST_ARG],
+                              int(words[SECOND_ARG]), curr_line)
+            elif len(words) > FIRST_ARG:
+                yield Command(command_type, words[FIRST_ARG], INVALID_TYPE,
+                              curr_line)
+            else:
+                yield Command(command_type, INVALID_TYPE, INVALID_TYPE,
+                              curr_line)
 
 
 class Parser:
     """
     parses each VM command into it's lexical elements
     """
-    BINARY_T = {"C_PUSH", "C_POP", "C_FUNCTION", "C_CALL"}
     ARITHMETIC_T = {"add", "sub", "neg", "eq", "and", "or", "not", "gt", "lt"}
+    # the type of every command by its first word
+    TYPES = dict([("push", C_PUSH), ("pop", C_POP), ("label", C_LABEL),
+                  ("goto", C_GOTO), ("if-goto", C_IF),
+                  ("function", C_FUNCTION), ("call", C_CALL),
+                  ("return", C_RETURN)] +
+                 [(name, C_ARITHMETIC) for name in ARITHMETIC_T])
 
     def __init__(self, file):
         """
-        the parser constructor
+        the parser constructor - the commands are read from the file while
+        they are parsed, one ahead of the current one
         :param file: the file we wish to parse
         """
-        self.__lines = []
-        for line in open(file):
-            curr_line = "".join(re.findall(REGEX, line))
-            if curr_line:
-                self.__lines.append(curr_line)
-        self.__num_of_commands = len(self.__lines)
-        self.__current_command = NO_COMMAND
+        self.__commands = decode_commands(file)
+        self.__current = None
+        self.__next = next(self.__commands, None)
 
     def has_more_commands(self):
         """
         boolean function that checks if there are more commands to parse
         :return: true iff there are more commands to parse
         """
-        return self.__current_command < self.__num_of_commands - 1
+        return self.__next is not None
 
     def advance(self):
         """
-        increments the current command counter every time we parse a command
+        moves on to the next command
         :return: if there are no more commands
         """
         if not self.has_more_commands():
             return
-        self.__current_command += 1
+        self.__current = self.__next
+        self.__next = next(self.__commands, None)
 
     def command_type(self):
         """
         gets the command type
-        :return: "C_ARITHMETIC" if arithmetic, "C_PUSH/POP" if push/pop
-        """
-        curr_arg1 = self.__lines[self.__current_command].split(' ', 1)[0]
-        if curr_arg1 in Parser.ARITHMETIC_T:
-            return "C_ARITHMETIC"
-        if curr_arg1 == "push":
-            return "C_PUSH"
-        elif curr_arg1 == "pop":
-            return "C_POP"
-        else:
-            return curr_arg1
+        :return: C_ARITHMETIC if arithmetic, C_PUSH/C_POP if push/pop, otherwise
+        the opcode of the command itself (C_LABEL, C_GOTO etc.)
+        """
+        return self.__current.type
 
     def arg1(self):
         """
@@ -79,29 +139,21 @@ class Parser:
         C ARITHMETIC the command itself (add, sub etc.), is returned.
         :return: a string of the first argument of the current command
         """
-        curr_line = self.__lines[self.__current_command]
-        if curr_line == RETURN_TYPE:
-            return INVALID_TYPE
-        if curr_line in Parser.ARITHMETIC_T:
-            return curr_line
-        return curr_line.split(' ', 2)[FIRST_ARG]
+        return self.__current.arg1
 
     def arg2(self):
         """
         returns the second argument of the current command
         :return: int (the index argument of the command)
         """
-        if self.command_type() in Parser.BINARY_T or self.command_type() in ["function", "call"]:
-            return self.__lines[self.__current_command].split(' ', 2)[SECOND_ARG]
-        else:
-            return INVALID_TYPE
+        return self.__current.arg2
 
     def get_curr_line(self):
         """
         gets the current line we are parsing
         :return: the current line
         """
-        return self.__lines[self.__current_command]
+        return self.__current.line
 
 
 class CodeWriter(object):
@@ -109,13 +161,31 @@ class CodeWriter(object):
     generates assembly code from the parsed VM command
     """
 
-    def __init__(self, output_file_name):
+    def __init__(self, output_file_name, shared_compare=False,
+                 shared_call=False, asm_rules=None):
         """
         a CodeWriter constructor
         :param output_file_name: the output filename we wish to write to
+        :param shared_compare: True to translate eq, gt and lt to jumps to
+        one shared routine of each, written at the end of the file
+        :param shared_call: True to translate call and return to jumps to
+        the shared $CALL and $RETURN routines, written at the end of the file
+        :param asm_rules: the names of the peephole rules (see AsmPeephole)
+        to run over the whole file before it is written, None or an empty
+        list to write every line right away
         """
         self.output_asm = open(output_file_name, 'w')
         self.current_file = ""
+        self.shared_compare = shared_compare
+        self.shared_call = shared_call
+        # the commands whose shared routines should be written
+        self._routines_used = set()
+        self._asm_rules = list(asm_rules or [])
+        # the lines kept for the peephole rules
+        self._lines = []
+        self.asm_stats = dict.fromkeys(ASM_RULE_NAMES, 0)
+        # the number of hack instructions written so far
+        self.words = 0
         self._bool_counter = 0
         self._return_counter = 0
         self._operators = self._init_operators()
@@ -180,6 +250,23 @@ class CodeWriter(object):
         self._write("\n//Call Function\n")
 
         return_add = func_name + "$ret." + str(self._return_counter)
+        if self.shared_call:
+            self._write("@" + func_name)  # R13 = the function
+            self._write("D=A")
+            self._write("@R13")
+            self._write("M=D")
+            self._write("@" + str(5 + int(nargs)))  # R14 = the frame size
+            self._write("D=A")
+            self._write("@R14")
+            self._write("M=D")
+            self._write("@" + return_add)  # D = the return address
+            self._write("D=A")
+            self._write("@" + CALL_ROUTINE)
+            self._write("0;JMP")
+            self._write("(" + return_add + ")")
+            self._routines_used.add("call")
+            self._return_counter += 1
+            return
         self._update_stack_const(return_add)
 
         self._update_stack_address("LCL")
@@ -206,12 +293,61 @@ class CodeWriter(object):
 
         self._return_counter += 1
 
+    def write_call_routine(self):
+        """
+        writes the shared $CALL routine: it pushes the return address in D
+        and the segments of the caller, sets ARG to SP minus the frame size
+        in R14, sets LCL and jumps to the function in R13
+        """
+        self._write("\n//" + CALL_ROUTINE + "\n")
+        self._write("(" + CALL_ROUTINE + ")")
+        self._push_to_stack()
+
+        self._update_stack_address("LCL")
+        self._update_stack_address("ARG")
+        self._update_stack_address("THIS")
+        self._update_stack_address("THAT")
+
+        self._write("@SP")
+        self._write("D=M")
+        self._write("@R14")
+        self._write("D=D-M")
+        self._write("@ARG")
+        self._write("M=D")
+
+        self._write("@SP")
+        self._write("D=M")
+        self._write("@LCL")
+        self._write("M=D")
+
+        self._write("@R13")
+        self._write("A=M")
+        self._write("0;JMP")
+
     def write_return(self):
         """
         writes the assembly code that is the translation of the return command
         """
         self._write("\n//Return\n")
+        if self.shared_call:
+            self._write("@" + RETURN_ROUTINE)
+            self._write("0;JMP")
+            self._routines_used.add("return")
+            return
+        self._write_return_body()
+
+    def write_return_routine(self):
+        """
+        writes the shared $RETURN routine, the code of a return
+        """
+        self._write("\n//" + RETURN_ROUTINE + "\n")
+        self._write("(" + RETURN_ROUTINE + ")")
+        self._write_return_body()
 
+    def _write_return_body(self):
+        """
+        writes the restoring of the frame of the caller and the jump back
+        """
         self._write("@LCL")
         self._write("D=M")
         self._write("@R14")  # endFrame =LCL
@@ -275,6 +411,9 @@ class CodeWriter(object):
             self.handle_unary_op(command)
 
         elif command in self._operators[BOOL]:  # Boolean operators
+            if self.shared_compare:  # the routine leaves the stack as it is
+                self.call_compare(command)
+                return
             self.handle_boolean_op(command)
         else:
             print(WRONG_COMMAND)
@@ -293,13 +432,13 @@ class CodeWriter(object):
         """
         self._write("\n// " + line)
         self._write_address(segment, index)
-        if command == 'C_PUSH':  # we want to load M[address] to D
+        if command == C_PUSH:  # we want to load M[address] to D
             if segment == 'constant':
                 self._write('D=A')
             else:
                 self._write('D=M')
             self._push_to_stack()
-        elif command == 'C_POP':  # we want to load D to M[address]
+        elif command == C_POP:  # we want to load D to M[address]
             self._write('D=A')
             self._write('@R13')  # keep address in R13
             self._write('M=D')
@@ -359,6 +498,81 @@ class CodeWriter(object):
         self._write('M=D')
         self._bool_counter += 1
 
+    def call_compare(self, command):
+        """
+        writes a jump to the shared routine of the boolean operator, with the
+        address to come back to in D
+        :param command: the boolean operator
+        """
+        return_add = self.function_name + "$cmp." + str(self._bool_counter)
+        self._write('@' + return_add)
+        self._write('D=A')
+        self._write('@' + COMPARE_ROUTINE.format(command.upper()))
+        self._write('0;JMP')
+        self._write('(' + return_add + ')')
+        self._routines_used.add(command)
+        self._bool_counter += 1
+
+    def write_compare_routine(self, command):
+        """
+        writes the shared routine of a boolean operator. it pops y, replaces
+        x with the result and jumps back to the address in D. for gt and lt
+        x - y is only computed when the signs are the same (so it can not
+        overflow), otherwise the sign of x decides
+        :param command: the boolean operator
+        """
+        label = COMPARE_ROUTINE.format(command.upper())
+        self._write("\n//" + label + "\n")
+        self._write('(' + label + ')')
+        self._write('@R15')  # keep the return address in R15
+        self._write('M=D')
+        self._pop_stack()
+        if command != 'eq':  # x - y is 0 iff they are equal, even on overflow
+            self._write('@R13')  # keep y in R13
+            self._write('M=D')
+            self._write('@SP')
+            self._write('A=M-1')
+            self._write('D=M')
+            self._write('@' + label + '.X_NEG')
+            self._write('D;JLT')
+            self._write('@R13')
+            self._write('D=M')
+            self._write('@' + label + '.SAME_SIGN')
+            self._write('D;JGE')
+            self._write('D=1')  # x >= 0 > y
+            self._write('@' + label + '.CHECK')
+            self._write('0;JMP')
+            self._write('(' + label + '.X_NEG)')
+            self._write('@R13')
+            self._write('D=M')
+            self._write('@' + label + '.SAME_SIGN')
+            self._write('D;JLT')
+            self._write('D=-1')  # x < 0 <= y
+            self._write('@' + label + '.CHECK')
+            self._write('0;JMP')
+            self._write('(' + label + '.SAME_SIGN)')
+            self._write('@R13')
+            self._write('D=M')
+        self._write('@SP')
+        self._write('A=M-1')
+        self._write('D=M-D')
+        if command != 'eq':
+            self._write('(' + label + '.CHECK)')
+        self._write('@' + label + '.TRUE')
+        self._write('D;' + self._operators[BOOL][command])
+        self._write('D=0')
+        self._write('@' + label + '.END')
+        self._write('0;JMP')
+        self._write('(' + label + '.TRUE)')
+        self._write('D=-1')
+        self._write('(' + label + '.END)')
+        self._write('@SP')
+        self._write('A=M-1')
+        self._write('M=D')
+        self._write('@R15')
+        self._write('A=M')
+        self._write('0;JMP')
+
     def handle_unary_op(self, command):
         """
         writes the unary operation
@@ -380,8 +594,19 @@ class CodeWriter(object):
 
     def close(self):
         """
-        closes the asm file
-        """
+        writes the shared routines that were used and closes the asm file
+        """
+        for command in ('eq', 'gt', 'lt'):
+            if command in self._routines_used:
+                self.write_compare_routine(command)
+        if 'call' in self._routines_used:
+            self.write_call_routine()
+        if 'return' in self._routines_used:
+            self.write_return_routine()
+        if self._asm_rules:
+            for line in optimize(self._lines, self._asm_rules,
+                                 self.asm_stats):
+                self._write_line(line)
         self.output_asm.close()
 
     @staticmethod
@@ -432,7 +657,22 @@ class CodeWriter(object):
 
     def _write(self, output_line):
         """
-        writes the output line to the output file
+        writes the output line to the output file (or keeps it for the
+        peephole rules)
+        :param output_line: the line we are writing
+        """
+        if self._asm_rules:
+            self._lines.append(output_line)
+        else:
+            self._write_line(output_line)
+        instruction = output_line.strip()
+        if instruction and not instruction.startswith('//') and \
+                not instruction.startswith('('):
+            self.words += 1
+
+    def _write_line(self, output_line):
+        """
+        writes a line to the output file
         :param output_line: the line we are writing
         """
         out = output_line if '(' in output_line else '\t' + output_line
@@ -516,58 +756,189 @@ def translate_to_assembler(file, code_writer):
     while parser.has_more_commands():
         parser.advance()
         curr_type = parser.command_type()
-        if curr_type in ["C_PUSH", "C_POP"]:
+        if curr_type == C_PUSH or curr_type == C_POP:
             code_writer.write_push_pop(curr_type, parser.arg1(), parser.arg2(),
                                        parser.get_curr_line())
-        elif curr_type == "C_ARITHMETIC":
+        elif curr_type == C_ARITHMETIC:
             code_writer.write_arithmetic(parser.arg1(), parser.get_curr_line())
-        elif curr_type == "label":
+        elif curr_type == C_LABEL:
             code_writer.write_label(parser.arg1())
-        elif curr_type == "goto":
+        elif curr_type == C_GOTO:
             code_writer.write_goto(parser.arg1())
-        elif curr_type == "if-goto":
+        elif curr_type == C_IF:
             code_writer.write_if(parser.arg1())
-        elif curr_type == "function":
+        elif curr_type == C_FUNCTION:
             code_writer.write_function(parser.arg1(), parser.arg2())
-        elif curr_type == "call":
+        elif curr_type == C_CALL:
             code_writer.write_call(parser.arg1(), parser.arg2())
         else:
             code_writer.write_return()
 
 
-def translate_dir(dir_path):
+def read_commands(file):
+    """
+    :param file: a vm file
+    :return: the commands of the file, tuples of their words
+    """
+    return [tuple(command.line.split()) for command in decode_commands(file)]
+
+
+def write_commands(commands, code_writer):
+    """
+    translates commands that were read by read_commands (and changed by the
+    link step)
+    :param commands: list of tuples of the words of the commands
+    :param code_writer: the code writer of the output file
+    """
+    for command in commands:
+        opcode = Parser.TYPES[command[0]]
+        line = " ".join(command[:3])
+        if opcode == C_PUSH or opcode == C_POP:
+            cur_file = code_writer.current_file
+            if len(command) > 3:  # a static of another file
+                code_writer.current_file = command[3]
+            code_writer.write_push_pop(opcode, command[1], command[2], line)
+            code_writer.current_file = cur_file
+        elif opcode == C_ARITHMETIC:
+            code_writer.write_arithmetic(command[0], line)
+        elif opcode == C_LABEL:
+            code_writer.write_label(command[1])
+        elif opcode == C_GOTO:
+            code_writer.write_goto(command[1])
+        elif opcode == C_IF:
+            code_writer.write_if(command[1])
+        elif opcode == C_CALL:
+            code_writer.write_call(command[1], command[2])
+        else:
+            code_writer.write_return()
+
+
+def write_functions(functions, code_writer):
+    """
+    translates VMFunctions
+    :param functions: list of VMFunctions
+    :param code_writer: the code writer of the output file
+    """
+    for function in functions:
+        code_writer.update_current_filename(function.file)
+        if function.name is not None:
+            code_writer.write_function(function.name, function.n_locals)
+        write_commands(function.commands, code_writer)
+
+
+def link_dir(dir_path, files, code_writer, inline_size=None,
+             remove_dead=False):
+    """
+    translates the vm files of a directory as one program - they are read
+    together, the link step changes them (see VMLinker) and then they are
+    written in the same order
+    :param dir_path: the directory
+    :param files: the names of its vm files
+    :param code_writer: the code writer of the output file
+    :param inline_size: the most commands of a function that is inlined,
+    None to inline nothing
+    :param remove_dead: True to remove the functions Sys.init never gets to,
+    and print what was removed and how many words it saved
+    """
+    functions = []
+    for file in files:
+        functions.extend(split_functions(
+            file.split('.')[0], read_commands(dir_path + "/" + file)))
+    if inline_size is not None:
+        inline_functions(functions, inline_size)
+    if remove_dead:
+        removed = remove_unreachable(functions)
+        # the size of every removed function, as if it was translated
+        counter = CodeWriter(os.devnull, code_writer.shared_compare,
+                             code_writer.shared_call)
+        total = 0
+        for function in removed:
+            words = counter.words
+            write_functions([function], counter)
+            print(REMOVED_FUNCTION.format(function.name,
+                                          counter.words - words))
+            total += counter.words - words
+        counter.close()
+        print(REMOVED_TOTAL.format(len(removed), total))
+    write_functions(functions, code_writer)
+
+
+def translate_dir(dir_path, inline_size=None, remove_dead=False,
+                  shared_compare=False, shared_call=False, asm_rules=None):
     """
     translates all the vm files in a given directory
     :param dir_path: the dearest of paths
+    :param inline_size: the most commands of a function that is inlined
+    (see VMLinker), None to translate every file as it is
+    :param remove_dead: True to remove the functions that are never called
+    (see VMLinker)
+    :param shared_compare: True to jump to shared routines for eq, gt and lt
+    :param shared_call: True to jump to shared routines for call and return
+    :param asm_rules: the names of the peephole rules to run (see
+    AsmPeephole), None to run none
+    :return: dict of how many times every peephole rule matched
     """
     if dir_path.endswith("/"):
         dir_path = dir_path[0:-1]
     files = os.listdir(dir_path)
     directory_name = os.path.basename(dir_path)
     output_name = dir_path + "/" + directory_name + ".asm"
-    code_writer = CodeWriter(output_name)
-    gen = (file for file in files if file.endswith('.vm'))
-    for file in gen:
-        code_writer.update_current_filename(file)
-        translate_to_assembler(dir_path + "/" + file, code_writer)
+    code_writer = CodeWriter(output_name, shared_compare, shared_call,
+                             asm_rules)
+    gen = [file for file in files if file.endswith('.vm')]
+    if inline_size is not None or remove_dead:
+        link_dir(dir_path, gen, code_writer, inline_size, remove_dead)
+    else:
+        for file in gen:
+            code_writer.update_current_filename(file)
+            translate_to_assembler(dir_path + "/" + file, code_writer)
     code_writer.close()
+    return code_writer.asm_stats
 
 
 if __name__ == '__main__':
-
-    if len(sys.argv) != NUM_OF_ARG:
-        print(ARG_ERROR)
-        sys.exit()
-    current_input = sys.argv[1]
+    arg_parser = argparse.ArgumentParser(
+        description="translates vm files to hack assembly")
+    arg_parser.add_argument("path", help="a vm file or a directory of them")
+    arg_parser.add_argument("--inline", type=int, metavar="SIZE",
+                            help="inline the functions of at most SIZE "
+                                 "commands at their calls (a directory only)")
+    arg_parser.add_argument("--remove-dead", action="store_true",
+                            help="remove the functions Sys.init never gets "
+                                 "to and print them (a directory only)")
+    arg_parser.add_argument("--shared-compare", action="store_true",
+                            help="translate eq, gt and lt to jumps to one "
+                                 "shared routine of each")
+    arg_parser.add_argument("--shared-call", action="store_true",
+                            help="translate call and return to jumps to one "
+                                 "shared routine of each")
+    arg_parser.add_argument("--asm-rules", metavar="NAMES", default="none",
+                            help="the peephole rules to run over the "
+                                 "assembly, a comma separated list of " +
+                                 ", ".join(ASM_RULE_NAMES) +
+                                 ", 'all' or 'none' (default: none)")
+    arg_parser.add_argument("--asm-stats", action="store_true",
+                            help="print how many times every peephole rule "
+                                 "of the assembly matched")
+    args = arg_parser.parse_args()
+    current_input = args.path
+    asm_rules = parse_asm_rules(args.asm_rules)
     if os.path.isdir(current_input):  # input is directory
-        translate_dir(current_input)
+        asm_stats = translate_dir(current_input, args.inline,
+                                  args.remove_dead, args.shared_compare,
+                                  args.shared_call, asm_rules)
     elif not os.path.isfile(current_input):  # no such file
         print(NO_SUCH_FILE_ERROR + current_input)
         sys.exit()
     else:  # input is single file
         file_name = current_input.split('.')[0]
         current_output = file_name + ".asm"
-        code = CodeWriter(current_output)
+        code = CodeWriter(current_output, args.shared_compare,
+                          args.shared_call, asm_rules)
         code.current_file = current_output
         translate_to_assembler(current_input, code)
         code.close()
+        asm_stats = code.asm_stats
+    if args.asm_stats:
+        for rule_name, rule_hits in asm_stats.items():
+            print(rule_name + ": " + str(rule_hits))
@@ -0,0 +1,360 @@
+import unittest
+from VMLinker import *
+from VMLinker import _inline_body, _stack_depths
+
+
+def commands_of(text):
+    """
+    :param text: vm commands, one in every line
+    :return: list of tuples of the words of the commands
+    """
+    return [tuple(line.split()) for line in text.strip().splitlines()]
+
+
+class StackDepthsTest(unittest.TestCase):
+
+    def assertDepthsKnown(self, text, expected=True):
+        depths = _stack_depths(commands_of(text))
+        self.assertEqual(depths is not None, expected)
+
+    def test_binary(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            push argument 1
+            add
+            return""")
+
+    def test_binary_reads_below_start(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            add
+            pop temp 0
+            push constant 1
+            return""", False)
+        self.assertDepthsKnown("""
+            push argument 0
+            add
+            push constant 1
+            return""", False)
+
+    def test_unary(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            neg
+            return""")
+
+    def test_unary_reads_below_start(self):
+        self.assertDepthsKnown("""
+            not
+            push argument 0
+            return""", False)
+
+    def test_pop_below_start(self):
+        self.assertDepthsKnown("""
+            pop temp 0
+            push constant 0
+            return""", False)
+
+    def test_call(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            push argument 1
+            call Math.max 2
+            return""")
+
+    def test_call_takes_too_many(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            call Math.max 2
+            return""", False)
+
+    def test_value_under_return_value(self):
+        # a do before the return leaves its value on the stack
+        commands = commands_of("""
+            push argument 0
+            call Memory.deAlloc 1
+            push constant 0
+            return""")
+        self.assertEqual(_stack_depths(commands), {0: 0, 1: 1, 2: 1, 3: 2})
+
+    def test_no_value_at_return(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            pop temp 0
+            return""", False)
+
+    def test_branches(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            if-goto ELSE
+            push constant 1
+            return
+            label ELSE
+            push constant 2
+            return""")
+
+    def test_branches_disagree(self):
+        self.assertDepthsKnown("""
+            push argument 0
+            push argument 0
+            if-goto END
+            push constant 1
+            label END
+            return""", False)
+
+    def test_loop(self):
+        self.assertDepthsKnown("""
+            label LOOP
+            push argument 0
+            if-goto LOOP
+            push constant 0
+            return""")
+
+    def test_unknown_label(self):
+        self.assertDepthsKnown("""
+            goto NOWHERE
+            push constant 0
+            return""", False)
+
+    def test_never_returns(self):
+        self.assertDepthsKnown("""
+            label LOOP
+            goto LOOP""")
+
+
+class InlineBodyTest(unittest.TestCase):
+
+    def test_arguments_in_new_locals(self):
+        callee = VMFunction("Foo.add", "Foo", 0, commands_of("""
+            push argument 0
+            push argument 1
+            add
+            return"""))
+        caller = VMFunction("Main.main", "Main", 1, [])
+        commands, extra = _inline_body(callee, callee.commands, 2, caller, 0)
+        self.assertEqual(commands, commands_of("""
+            pop local 2
+            pop local 1
+            push local 1
+            push local 2
+            add"""))
+        self.assertEqual(extra, 2)
+
+    def test_locals_labels_pointers_and_statics(self):
+        callee = VMFunction("Bar.f", "Bar", 1, commands_of("""
+            push argument 0
+            if-goto L
+            push constant 1
+            return
+            label L
+            push static 0
+            pop local 0
+            push local 0
+            pop pointer 1
+            push that 0
+            return"""))
+        caller = VMFunction("Main.main", "Main", 2, [])
+        commands, extra = _inline_body(callee, callee.commands, 1, caller, 7)
+        self.assertEqual(commands, commands_of("""
+            pop local 2
+            push constant 0
+            pop local 3
+            push pointer 1
+            pop local 4
+            push local 2
+            if-goto Bar.f$7$L
+            push constant 1
+            goto Bar.f$7.end
+            label Bar.f$7$L
+            push static 0 Bar
+            pop local 3
+            push local 3
+            pop pointer 1
+            push that 0
+            label Bar.f$7.end
+            push local 4
+            pop pointer 1"""))
+        self.assertEqual(extra, 3)
+
+    def test_values_under_return_value_dropped(self):
+        callee = VMFunction("Foo.dispose", "Foo", 0, commands_of("""
+            push argument 0
+            if-goto SKIP
+            push constant 0
+            push constant 0
+            return
+            label SKIP
+            push argument 0
+            call Memory.deAlloc 1
+            push constant 0
+            return"""))
+        caller = VMFunction("Main.main", "Main", 0, [])
+        commands, extra = _inline_body(callee, callee.commands, 1, caller, 0)
+        self.assertEqual(commands, commands_of("""
+            pop local 0
+            push local 0
+            if-goto Foo.dispose$0$SKIP
+            push constant 0
+            push constant 0
+            pop temp 0
+            pop temp 1
+            push temp 0
+            goto Foo.dispose$0.end
+            label Foo.dispose$0$SKIP
+            push local 0
+            call Memory.deAlloc 1
+            push constant 0
+            pop temp 0
+            pop temp 1
+            push temp 0
+            label Foo.dispose$0.end"""))
+        self.assertEqual(extra, 1)
+
+    def test_body_with_inlined_calls(self):
+        # Foo.g with a call of Bar.h inlined in it, Bar.h sets pointer 1
+        callee = VMFunction("Foo.g", "Foo", 1, commands_of("""
+            push argument 0
+            call Bar.h 1
+            return"""))
+        body = commands_of("""
+            push argument 0
+            pop local 1
+            push pointer 1
+            pop local 2
+            push local 1
+            pop pointer 1
+            push that 0
+            push static 3 Bar
+            add
+            push local 2
+            pop pointer 1
+            return""")
+        caller = VMFunction("Main.main", "Main", 0, [])
+        commands, extra = _inline_body(callee, body, 1, caller, 0, 3)
+        self.assertEqual(commands, commands_of("""
+            pop local 0
+            push constant 0
+            pop local 1
+            push local 0
+            pop local 2
+            push pointer 1
+            pop local 3
+            push local 2
+            pop pointer 1
+            push that 0
+            push static 3 Bar
+            add
+            push local 3
+            pop pointer 1"""))
+        self.assertEqual(extra, 4)
+
+    def test_static_of_same_file(self):
+        callee = VMFunction("Main.get", "Main", 0, commands_of("""
+            push static 1
+            return"""))
+        caller = VMFunction("Main.main", "Main", 0, [])
+        commands, extra = _inline_body(callee, callee.commands, 0, caller, 0)
+        self.assertEqual(commands, [("push", "static", "1")])
+        self.assertEqual(extra, 0)
+
+
+class InlineFunctionsTest(unittest.TestCase):
+
+    def _functions(self):
+        return split_functions("Main", commands_of("""
+            function Main.main 0
+            push constant 3
+            push constant 4
+            call Main.add 2
+            push constant 5
+            push constant 6
+            call Main.bad 1
+            return
+            function Main.add 0
+            push argument 0
+            push argument 1
+            add
+            return
+            function Main.bad 0
+            push argument 0
+            add
+            return"""))
+
+    def test_inline(self):
+        functions = self._functions()
+        self.assertEqual(inline_functions(functions, 10), 1)
+        main = functions[0]
+        self.assertNotIn(("call", "Main.add", "2"), main.commands)
+        self.assertIn(("call", "Main.bad", "1"), main.commands)
+        self.assertEqual(main.n_locals, 2)
+
+    def test_too_large(self):
+        functions = self._functions()
+        self.assertEqual(inline_functions(functions, 3), 0)
+
+    def test_do_wrapper(self):
+        # "do Memory.poke(i, v); return;" leaves the value of the do under
+        # the return value, both of the calls are inlined
+        functions = split_functions("Main", commands_of("""
+            function Main.main 0
+            push constant 8000
+            push constant 7
+            call Main.put 2
+            pop temp 0
+            push constant 0
+            return
+            function Main.put 0
+            push argument 0
+            push argument 1
+            call Memory.poke 2
+            push constant 0
+            return
+            function Memory.poke 0
+            push argument 1
+            push argument 0
+            pop pointer 1
+            pop that 0
+            push constant 0
+            return"""))
+        # poke in put, and put (with poke in it) in main
+        self.assertEqual(inline_functions(functions, 10), 2)
+        main, put, poke = functions
+        self.assertFalse(any(command[0] == "call"
+                             for command in main.commands + put.commands))
+        self.assertEqual(main.commands[-7:], commands_of("""
+            push constant 0
+            pop temp 0
+            pop temp 1
+            push temp 0
+            pop temp 0
+            push constant 0
+            return"""))
+        # two arguments of put, two of poke and the save of pointer 1
+        self.assertEqual(main.n_locals, 5)
+        self.assertEqual(put.n_locals, 3)
+        self.assertEqual(poke.n_locals, 0)
+
+    def test_cycle_of_calls(self):
+        functions = split_functions("Main", commands_of("""
+            function Main.even 0
+            push argument 0
+            call Main.odd 1
+            return
+            function Main.odd 0
+            push argument 0
+            call Main.even 1
+            return"""))
+        # odd is inlined in even, the call of even in odd stays
+        self.assertEqual(inline_functions(functions, 10), 1)
+        even, odd = functions
+        self.assertEqual([command for command in even.commands
+                          if command[0] == "call"],
+                         [("call", "Main.even", "1")])
+        self.assertEqual(odd.commands, commands_of("""
+            push argument 0
+            call Main.even 1
+            return"""))
+
+
+if __name__ == '__main__':
+    unittest.main()